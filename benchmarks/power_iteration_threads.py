@@ -0,0 +1,88 @@
+import argparse
+import os
+import time
+from typing import List
+
+import numpy as np
+from scipy.sparse import csr_array, diags_array
+
+from recommendation_engine.markov import PowerIterationRW
+
+
+def build_kernel(n: int, degree: int, seed: int) -> csr_array:
+    # Random row-stochastic kernel with `degree` arcs per row
+    rng = np.random.default_rng(seed)
+    rows = np.repeat(np.arange(n), degree)
+    A = csr_array(
+        (rng.random(n * degree), (rows, rng.integers(n, size=n * degree))),
+        shape=(n, n),
+    )
+
+    return csr_array(diags_array(1 / A.sum(axis=1)) @ A)
+
+
+def build_restart(n: int, batch: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    pi0 = np.zeros((batch, n))
+    for row in pi0:
+        row[rng.choice(n, size=3, replace=False)] = 1 / 3
+
+    return pi0[0] if batch == 1 else pi0
+
+
+def time_run(rw: PowerIterationRW, repeats: int) -> float:
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rw.run()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def run(
+    n: int, degree: int, batch: int, iterations: int, threads: List[int], repeats: int
+) -> None:
+    P = build_kernel(n, degree, seed=0)
+    pi0 = build_restart(n, batch, seed=1)
+    print(f"kernel: {n} nodes, {P.nnz} arcs, batch of {batch}, {iterations} sweeps")
+
+    reference, baseline = None, None
+    for n_threads in threads:
+        # tol=0 runs exactly max_iter sweeps, so every thread count does the
+        # same work
+        rw = PowerIterationRW(P, pi0, tol=0.0, max_iter=iterations, n_threads=n_threads)
+        scores = rw.run()
+        elapsed = time_run(rw, repeats)
+
+        if reference is None:
+            reference, baseline = scores, elapsed
+        np.testing.assert_allclose(scores, reference, rtol=1e-10, atol=1e-14)
+
+        speedup = baseline / elapsed
+        print(
+            f"threads={n_threads:>3}  {elapsed * 1000:9.1f} ms  "
+            f"speedup={speedup:5.2f}x  efficiency={speedup / n_threads:6.1%}"
+        )
+
+
+if __name__ == "__main__":
+    # Times PowerIterationRW over its block matvec for 1..N threads:
+    #   python -m benchmarks.power_iteration_threads --nodes 2000000 --threads 8
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=1_000_000)
+    parser.add_argument("--degree", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    run(
+        args.nodes,
+        args.degree,
+        args.batch,
+        args.iterations,
+        list(range(1, args.threads + 1)),
+        args.repeats,
+    )
@@ -40,3 +40,4 @@ class Config:
     DATABASE_URL_EXP = get_env_variable("DATABASE_URL_EXP")
     DATABASE_URL_TEST = get_env_variable("DATABASE_URL_TEST")
     CONFIG_ROOT = Path(__file__).resolve().parent / "configs"
+    KERNEL_STORE_ROOT = Path(__file__).resolve().parent / "snapshots"
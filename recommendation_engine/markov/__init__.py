@@ -1,11 +1,34 @@
+from recommendation_engine.markov.diagnostics import (  # noqa: F401, E402
+    KernelDiagnostics,
+    KernelHealthReport,
+)
 from recommendation_engine.markov.initial_distribution import (  # noqa: F401, E402
     InitialDistributionBuilder,
 )
+from recommendation_engine.markov.item_table import (  # noqa: F401, E402
+    ItemTable,
+    ItemTableBuilder,
+)
 from recommendation_engine.markov.kernel import MarkovKernel  # noqa: F401, E402
+from recommendation_engine.markov.kernel_store import KernelStore  # noqa: F401, E402
 from recommendation_engine.markov.node_index import NodeIndex  # noqa: F401, E402
+from recommendation_engine.markov.ppr_cache import PPRCache  # noqa: F401, E402
+from recommendation_engine.markov.random_walk import ForwardPushRW  # noqa: F401, E402
 from recommendation_engine.markov.random_walk import MonteCarloRW  # noqa: F401, E402
 from recommendation_engine.markov.random_walk import RandomWalkBase  # noqa: F401, E402
 from recommendation_engine.markov.random_walk import (  # noqa: F401, E402
+    LinearSolverRW,
+    LowRankResolvent,
+    LowRankRW,
+    MonteCarloPPRRW,
     PowerIterationRW,
     RandomWalkFactory,
+    WalkerEngine,
+)
+from recommendation_engine.markov.relation_blocks import (  # noqa: F401, E402
+    RelationBlocks,
+)
+from recommendation_engine.markov.track_chain import (  # noqa: F401, E402
+    TrackChain,
+    TrackChainBuilder,
 )
@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+import numpy as np
+from numpy import ndarray
+from scipy.sparse import csr_array, issparse
+from scipy.sparse.csgraph import connected_components
+
+from settings.mapping import NODE_TYPE_CODES
+
+
+@dataclass
+class KernelHealthReport:
+    n_nodes: int
+    tol: float
+    negative_entries: int
+    invalid_rows: ndarray
+    dangling_nodes: ndarray
+    self_loop_nodes: ndarray
+    absorbing_nodes: ndarray
+    row_sum_errors: Dict[str, float]
+    type_out_mass: Dict[str, Dict[str, float]]
+    scc_sizes: ndarray
+    closed_scc_sizes: ndarray
+
+    @property
+    def is_valid(self) -> bool:
+        return self.negative_entries == 0 and len(self.invalid_rows) == 0
+
+    def summary(self) -> Dict:
+        return {
+            "n_nodes": self.n_nodes,
+            "is_valid": self.is_valid,
+            "negative_entries": self.negative_entries,
+            "invalid_rows": len(self.invalid_rows),
+            "dangling_nodes": len(self.dangling_nodes),
+            "self_loop_nodes": len(self.self_loop_nodes),
+            "absorbing_nodes": len(self.absorbing_nodes),
+            "row_sum_errors": self.row_sum_errors,
+            "type_out_mass": self.type_out_mass,
+            "n_scc": len(self.scc_sizes),
+            "largest_scc": int(self.scc_sizes[0]) if len(self.scc_sizes) else 0,
+            "n_closed_scc": len(self.closed_scc_sizes),
+        }
+
+
+class KernelDiagnostics:
+    def __init__(
+        self,
+        P: Union[ndarray, csr_array],
+        node_types: Optional[ndarray] = None,
+        tol: float = 1e-8,
+    ):
+        self.P = P
+        self.node_types = node_types
+        self.tol = float(tol)
+        self.n = P.shape[0]
+
+    def get_values(self) -> ndarray:
+        return self.P.data if issparse(self.P) else self.P
+
+    def count_negative_entries(self) -> int:
+        return int(np.count_nonzero(self.get_values() < 0))
+
+    def get_row_sums(self) -> ndarray:
+        return np.asarray(self.P.sum(axis=1, dtype=np.float64)).ravel()
+
+    def get_invalid_rows(self, row_sums: Optional[ndarray] = None) -> ndarray:
+        if row_sums is None:
+            row_sums = self.get_row_sums()
+
+        return np.flatnonzero((row_sums > 0) & (np.abs(row_sums - 1.0) > self.tol))
+
+    def get_row_sum_errors(self, row_sums: ndarray) -> Dict[str, float]:
+        errors = np.abs(row_sums[row_sums > 0] - 1.0)
+        if len(errors) == 0:
+            return {}
+
+        p50, p95, p99 = np.percentile(errors, [50, 95, 99])
+        return {
+            "mean": float(errors.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(errors.max()),
+        }
+
+    def get_type_out_mass(self) -> Dict[str, Dict[str, float]]:
+        if self.node_types is None:
+            return {}
+
+        n_types = len(NODE_TYPE_CODES)
+        one_hot = np.zeros((self.n, n_types))
+        one_hot[np.arange(self.n), self.node_types] = 1.0
+
+        # mass[s, t]: total probability sent from nodes of type s to nodes of type t
+        mass = one_hot.T @ np.asarray(self.P @ one_hot)
+        counts = one_hot.sum(axis=0)
+
+        types = {code: t for t, code in NODE_TYPE_CODES.items()}
+        return {
+            types[s]: {types[t]: float(mass[s, t] / counts[s]) for t in range(n_types)}
+            for s in range(n_types)
+            if counts[s] > 0
+        }
+
+    def get_components(self) -> ndarray:
+        support = csr_array(self.P > 0)
+        _, labels = connected_components(support, directed=True, connection="strong")
+        return labels
+
+    def get_closed_components(self, labels: ndarray) -> ndarray:
+        support = csr_array(self.P > 0).tocoo()
+        leaving = labels[support.row] != labels[support.col]
+
+        closed = np.ones(labels.max() + 1, dtype=bool)
+        closed[labels[support.row[leaving]]] = False
+        return np.flatnonzero(closed)
+
+    def build_report(self) -> KernelHealthReport:
+        row_sums = self.get_row_sums()
+        diagonal = np.asarray(self.P.diagonal())
+
+        labels = self.get_components()
+        scc_sizes = np.bincount(labels)
+        closed = self.get_closed_components(labels)
+
+        return KernelHealthReport(
+            n_nodes=self.n,
+            tol=self.tol,
+            negative_entries=self.count_negative_entries(),
+            invalid_rows=self.get_invalid_rows(row_sums),
+            dangling_nodes=np.flatnonzero(row_sums == 0),
+            self_loop_nodes=np.flatnonzero(diagonal > 0),
+            absorbing_nodes=np.flatnonzero(np.abs(diagonal - 1.0) <= self.tol),
+            row_sum_errors=self.get_row_sum_errors(row_sums),
+            type_out_mass=self.get_type_out_mass(),
+            scc_sizes=np.sort(scc_sizes)[::-1],
+            closed_scc_sizes=np.sort(scc_sizes[closed])[::-1],
+        )
@@ -1,15 +1,21 @@
-from typing import List
+from typing import List, Tuple
 
 import numpy as np
-from numpy import ndarray
+from numpy import dtype, ndarray
 
 from recommendation_engine.markov.node_index import NodeIndex
 
 
 class InitialDistributionBuilder:
-    def __init__(self, seed_nodes: List[str], index: NodeIndex):
+    def __init__(
+        self,
+        seed_nodes: List[str],
+        index: NodeIndex,
+        dtype: dtype = np.float64,
+    ):
         self.index = index
         self.seed_nodes = seed_nodes
+        self.dtype = np.dtype(dtype)
 
     def get_valid_seeds(self) -> List[str]:
         valid_seeds = [n for n in self.seed_nodes if n in self.index.node_to_idx.keys()]
@@ -18,12 +24,18 @@ class InitialDistributionBuilder:
 
         return valid_seeds
 
-    def build(self) -> ndarray:
-        pi0 = np.zeros(self.index.n)
-
+    def get_seed_weights(self) -> Tuple[ndarray, ndarray]:
+        # A repeated seed keeps the weight of a single occurrence, so every
+        # strategy restarts from exactly the entries of build().
         valid_seeds = self.get_valid_seeds()
 
-        for node in valid_seeds:
-            pi0[self.index.node_to_idx[node]] = 1.0 / len(valid_seeds)
+        nodes = np.unique([self.index.node_to_idx[node] for node in valid_seeds])
+        return nodes, np.full(len(nodes), 1.0 / len(valid_seeds))
+
+    def build(self) -> ndarray:
+        pi0 = np.zeros(self.index.n, dtype=self.dtype)
+
+        nodes, weights = self.get_seed_weights()
+        pi0[nodes] = weights
 
         return pi0
@@ -0,0 +1,169 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+from recommendation_engine.markov.kernel import KernelMatrix
+from recommendation_engine.markov.node_index import NodeIndex
+from recommendation_engine.markov.random_walk import RandomWalkFactory
+
+logger = logging.getLogger(__name__)
+
+_WORKER_STATE = None
+
+
+def _init_worker(P: KernelMatrix, candidates: ndarray, top_n: int) -> None:
+    global _WORKER_STATE
+    _WORKER_STATE = (P, candidates, top_n)
+
+
+def _run_worker_chunk(rows: ndarray) -> Tuple[ndarray, ndarray]:
+    return compute_top_neighbours(*_WORKER_STATE, rows)
+
+
+def compute_top_neighbours(
+    P: KernelMatrix, candidates: ndarray, top_n: int, rows: ndarray
+) -> Tuple[ndarray, ndarray]:
+    # One batched PPR solve for the whole chunk, each track seeding its own
+    # column, then the top_n other tracks of every column.
+    pi0 = np.zeros((len(rows), P.shape[0]), dtype=P.dtype)
+    pi0[np.arange(len(rows)), rows] = 1.0
+    scores = RandomWalkFactory.create_power_iteration(P, pi0).run()[:, candidates]
+    scores[np.arange(len(rows)), np.searchsorted(candidates, rows)] = -np.inf
+
+    k = min(top_n, len(candidates) - 1)
+    neighbours = np.full((len(rows), top_n), -1, dtype=np.int32)
+    values = np.zeros((len(rows), top_n), dtype=np.float32)
+    if k <= 0:
+        return neighbours, values
+
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+
+    neighbours[:, :k] = candidates[np.take_along_axis(top, order, axis=1)]
+    values[:, :k] = np.take_along_axis(top_scores, order, axis=1)
+
+    return neighbours, values
+
+
+class ItemTable:
+    # Top-N PPR neighbours of every track: row i of neighbours/scores belongs to
+    # the track at node index tracks[i]. Rows are padded with -1 / 0.
+    def __init__(
+        self,
+        nodes: ndarray,
+        tracks: ndarray,
+        neighbours: ndarray,
+        scores: ndarray,
+    ):
+        self.nodes = nodes
+        self.tracks = tracks
+        self.neighbours = neighbours
+        self.scores = scores
+
+    def matches(self, index: NodeIndex) -> bool:
+        return len(self.nodes) == index.n and list(self.nodes) == index.nodes
+
+    def save(self, path: Path) -> None:
+        np.savez(
+            path,
+            nodes=self.nodes,
+            tracks=self.tracks,
+            neighbours=self.neighbours,
+            scores=self.scores,
+        )
+
+    @staticmethod
+    def load(path: Path) -> "ItemTable":
+        with np.load(path) as data:
+            return ItemTable(
+                nodes=data["nodes"],
+                tracks=data["tracks"],
+                neighbours=data["neighbours"],
+                scores=data["scores"],
+            )
+
+    def lookup(
+        self, seeds: ndarray, weights: ndarray, top_k: int
+    ) -> Tuple[ndarray, ndarray]:
+        # PPR is linear in pi0, so the seeds' truncated lists are merged with the
+        # seeds' restart weights.
+        positions = np.searchsorted(self.tracks, seeds)
+        positions = np.minimum(positions, len(self.tracks) - 1)
+        found = self.tracks[positions] == seeds
+        positions, weights = positions[found], weights[found]
+
+        neighbours = self.neighbours[positions].ravel()
+        values = (weights[:, None] * self.scores[positions]).ravel()
+
+        keep = (neighbours >= 0) & ~np.isin(neighbours, seeds)
+        nodes, inverse = np.unique(neighbours[keep], return_inverse=True)
+        merged = np.bincount(inverse, weights=values[keep])
+
+        k = min(top_k, len(nodes))
+        if k == 0:
+            return nodes, merged
+
+        top = np.argpartition(-merged, k - 1)[:k]
+        top = top[np.argsort(-merged[top], kind="stable")]
+        return nodes[top], merged[top]
+
+
+class ItemTableBuilder:
+    def __init__(
+        self,
+        P: KernelMatrix,
+        index: NodeIndex,
+        tracks: ndarray,
+        top_n: int = 50,
+        chunk_size: int = 64,
+        workers: int = 1,
+    ):
+        self.P = P
+        self.index = index
+        self.tracks = np.sort(np.asarray(tracks, dtype=np.int64))
+        self.top_n = int(top_n)
+        self.chunk_size = int(chunk_size)
+        self.workers = int(workers)
+
+    def get_chunks(self) -> List[ndarray]:
+        n_chunks = max(1, -(-len(self.tracks) // self.chunk_size))
+        return np.array_split(self.tracks, n_chunks)
+
+    def run_chunks(self, chunks: List[ndarray]) -> List[Tuple[ndarray, ndarray]]:
+        if self.workers <= 1:
+            return [
+                compute_top_neighbours(self.P, self.tracks, self.top_n, rows)
+                for rows in chunks
+            ]
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.P, self.tracks, self.top_n),
+        ) as executor:
+            return list(executor.map(_run_worker_chunk, chunks))
+
+    def build(self, path: Optional[Path] = None) -> ItemTable:
+        chunks = self.get_chunks()
+        logger.info(
+            f"Computing top-{self.top_n} neighbours of {len(self.tracks)} tracks "
+            f"in {len(chunks)} chunks..."
+        )
+        results = self.run_chunks(chunks)
+
+        table = ItemTable(
+            nodes=np.array(self.index.nodes),
+            tracks=self.tracks,
+            neighbours=np.concatenate([neighbours for neighbours, _ in results]),
+            scores=np.concatenate([scores for _, scores in results]),
+        )
+
+        if path is not None:
+            table.save(path)
+
+        return table
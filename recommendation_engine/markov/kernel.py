@@ -1,23 +1,59 @@
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 import numpy as np
 from networkx import Graph
-from numpy import ndarray
+from numpy import dtype, ndarray
+from scipy.sparse import csr_array
 
+from recommendation_engine.markov.diagnostics import (
+    KernelDiagnostics,
+    KernelHealthReport,
+)
 from recommendation_engine.markov.node_index import NodeIndex
+from recommendation_engine.markov.relation_blocks import (
+    RelationBlocks,
+    type_transition_array,
+)
 from settings.config_loader import load_markov_type_transition_matrix
 from settings.constants import MarkovStrategy
+from settings.mapping import NODE_TYPE_CODES
+
+KernelMatrix = Union[ndarray, csr_array]
+
+KERNEL_TOLERANCES = {
+    np.dtype(np.float64): 1e-8,
+    np.dtype(np.float32): 1e-5,
+}
 
 
 class MarkovKernel:
-    def __init__(self, G: Graph, strategy: Optional[MarkovStrategy] = None):
+    def __init__(
+        self,
+        G: Graph,
+        strategy: Optional[MarkovStrategy] = None,
+        sparse: bool = False,
+        dtype: dtype = np.float64,
+    ):
         self.G = G
         self.index = NodeIndex(self.G.nodes)
 
         self.strategy = strategy
         self.type_transition_matrix = load_markov_type_transition_matrix(self.strategy)
 
-        self.P = np.zeros((self.index.n, self.index.n))
+        self.sparse = sparse
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in KERNEL_TOLERANCES:
+            raise ValueError(f"Unsupported kernel dtype {self.dtype}")
+
+        self.P = self.allocate_kernel()
+        self.node_types = None
+        self.blocks = None
+
+    def allocate_kernel(self) -> KernelMatrix:
+        if self.sparse:
+            return csr_array((self.index.n, self.index.n), dtype=self.dtype)
+
+        return np.zeros((self.index.n, self.index.n), dtype=self.dtype)
 
     def get_node_type(self, node: str) -> str:
         return self.G.nodes[node]["type"]
@@ -74,30 +110,195 @@ class MarkovKernel:
 
         return probs
 
-    def fill_transition_row(self, node: str) -> None:
+    def compute_transition_row(self, node: str) -> Dict[int, float]:
         i = self.index.node_to_idx[node]
         probs = self.compute_neighbor_transition_probs(node)
 
         if not probs:
-            self.P[i, i] = 1.0
-            return
+            return {i: 1.0}
 
-        for neigh, p in probs.items():
-            j = self.index.node_to_idx[neigh]
+        return {self.index.node_to_idx[neigh]: p for neigh, p in probs.items()}
+
+    def fill_transition_row(self, node: str) -> None:
+        i = self.index.node_to_idx[node]
+
+        for j, p in self.compute_transition_row(node).items():
             self.P[i, j] = p
 
-    def validate_kernel(self, tol: float = 1e-8) -> None:
-        if np.any(self.P < 0):
+    def get_node_types(self) -> ndarray:
+        return np.array(
+            [NODE_TYPE_CODES[self.get_node_type(node)] for node in self.index.nodes],
+            dtype=np.int8,
+        )
+
+    def get_type_transition_array(
+        self, T: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> ndarray:
+        return type_transition_array(self.type_transition_matrix if T is None else T)
+
+    def get_edge_arrays(self) -> Tuple[ndarray, ndarray, ndarray, ndarray]:
+        node_to_idx = self.index.node_to_idx
+        edges = np.fromiter(
+            (
+                idx
+                for u, v in self.G.edges()
+                for idx in (node_to_idx[u], node_to_idx[v])
+            ),
+            dtype=np.int64,
+            count=2 * self.G.number_of_edges(),
+        ).reshape(-1, 2)
+
+        # Undirected edges become one arc per direction, self-loops a single arc
+        mirrored = edges[edges[:, 0] != edges[:, 1]]
+        src = np.concatenate([edges[:, 0], mirrored[:, 1]])
+        dst = np.concatenate([edges[:, 1], mirrored[:, 0]])
+
+        if self.node_types is None:
+            self.node_types = self.get_node_types()
+
+        return src, dst, self.node_types[src], self.node_types[dst]
+
+    def build_kernel_from_edges(
+        self,
+        src: ndarray,
+        dst: ndarray,
+        src_type: ndarray,
+        dst_type: ndarray,
+    ) -> KernelMatrix:
+        n = self.index.n
+
+        degrees = np.bincount(src, minlength=n)
+        if np.any(degrees == 0):
+            node = self.index.idx_to_node[int(np.argmin(degrees))]
+            raise ValueError(f"Node {node} should have at least one neighbor!")
+
+        self.blocks = RelationBlocks(src, dst, src_type, dst_type, n)
+        P = self.blocks.compose(self.get_type_transition_array(), self.dtype)
+
+        if self.sparse:
+            return P
+
+        return P.toarray()
+
+    def get_relation_blocks(self) -> RelationBlocks:
+        if self.blocks is None:
+            src, dst, src_type, dst_type = self.get_edge_arrays()
+            self.blocks = RelationBlocks(src, dst, src_type, dst_type, self.index.n)
+
+        return self.blocks
+
+    def compose_kernel(self, strategy: MarkovStrategy) -> KernelMatrix:
+        T = self.get_type_transition_array(load_markov_type_transition_matrix(strategy))
+        P = self.get_relation_blocks().compose(T, self.dtype)
+
+        if self.sparse:
+            return P
+
+        return P.toarray()
+
+    def get_diagnostics(self, tol: Optional[float] = None) -> KernelDiagnostics:
+        if tol is None:
+            tol = KERNEL_TOLERANCES[self.P.dtype]
+
+        return KernelDiagnostics(self.P, self.node_types, tol)
+
+    def diagnose(self, tol: Optional[float] = None) -> KernelHealthReport:
+        return self.get_diagnostics(tol).build_report()
+
+    def validate_kernel(self, tol: Optional[float] = None) -> None:
+        diagnostics = self.get_diagnostics(tol)
+
+        if diagnostics.count_negative_entries() > 0:
             raise ValueError("Negative probabilities detected")
 
-        row_sums = self.P.sum(axis=1)
-        for i, s in enumerate(row_sums):
-            if s > 0 and abs(s - 1.0) > tol:
-                raise ValueError(f"Row {i} sums to {s}, not 1")
+        row_sums = diagnostics.get_row_sums()
+        invalid_rows = diagnostics.get_invalid_rows(row_sums)
+        if len(invalid_rows) > 0:
+            i = invalid_rows[0]
+            raise ValueError(
+                f"Row {i} sums to {row_sums[i]}, not 1 "
+                f"({len(invalid_rows)} invalid rows)"
+            )
+
+    def build_kernel(self) -> KernelMatrix:
+        self.node_types = self.get_node_types()
+        self.P = self.build_kernel_from_edges(*self.get_edge_arrays())
+
+        self.validate_kernel()
+        return self.P
+
+    def get_affected_rows(
+        self,
+        added_nodes: Iterable[str],
+        added_edges: Iterable[Tuple[str, str]],
+    ) -> List[int]:
+        # A row only depends on its own neighbourhood, so the new nodes and both
+        # endpoints of every new edge (whose per-type neighbour counts shifted)
+        # are the only rows that change.
+        affected = set(added_nodes)
+        for u, v in added_edges:
+            affected.update((u, v))
+
+        return sorted(self.index.node_to_idx[node] for node in affected)
+
+    def replace_sparse_rows(self, rows: List[int]) -> csr_array:
+        n = self.index.n
+        P = self.P.tocoo()
+
+        keep = ~np.isin(P.row, rows)
+        new_rows, new_cols, new_data = [], [], []
+        for i in rows:
+            for j, p in self.compute_transition_row(self.index.idx_to_node[i]).items():
+                new_rows.append(i)
+                new_cols.append(j)
+                new_data.append(p)
+
+        return csr_array(
+            (
+                np.concatenate([P.data[keep], new_data]).astype(self.dtype),
+                (
+                    np.concatenate([P.row[keep], new_rows]).astype(np.int64),
+                    np.concatenate([P.col[keep], new_cols]).astype(np.int64),
+                ),
+            ),
+            shape=(n, n),
+        )
+
+    def replace_dense_rows(self, rows: List[int], n_prev: int) -> ndarray:
+        n = self.index.n
+        P = np.zeros((n, n), dtype=self.dtype)
+        P[:n_prev, :n_prev] = self.P
+
+        for i in rows:
+            P[i, :] = 0.0
+            for j, p in self.compute_transition_row(self.index.idx_to_node[i]).items():
+                P[i, j] = p
+
+        return P
+
+    def update_kernel(
+        self,
+        added_nodes: List[str],
+        added_edges: List[Tuple[str, str]],
+    ) -> KernelMatrix:
+        n_prev = self.index.n
+        self.index.extend(added_nodes)
+
+        new_types = [
+            NODE_TYPE_CODES[self.get_node_type(node)]
+            for node in self.index.nodes[n_prev:]
+        ]
+        self.node_types = np.concatenate(
+            [self.node_types, np.array(new_types, dtype=np.int8)]
+        )
+
+        self.blocks = None
 
-    def build_kernel(self) -> ndarray:
-        for node in self.index.nodes:
-            self.fill_transition_row(node)
+        rows = self.get_affected_rows(added_nodes, added_edges)
+        if self.sparse:
+            self.P = self.replace_sparse_rows(rows)
+        else:
+            self.P = self.replace_dense_rows(rows, n_prev)
 
         self.validate_kernel()
         return self.P
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from networkx import Graph
+from scipy.sparse import csr_array, issparse
+
+from config import Config
+from recommendation_engine.markov.kernel import MarkovKernel
+from recommendation_engine.markov.node_index import NodeIndex
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 2
+
+
+class KernelStore:
+    def __init__(self, root: Optional[Path] = None, keep: int = 2):
+        self.root = Path(root) if root is not None else Config.KERNEL_STORE_ROOT
+        self.keep = max(int(keep), 1)
+
+    @staticmethod
+    def fingerprint_graph(G: Graph) -> str:
+        nodes = sorted(G.nodes)
+        node_to_pos = {node: pos for pos, node in enumerate(nodes)}
+
+        digest = hashlib.sha256()
+        for node in nodes:
+            digest.update(f"{node}|{G.nodes[node]['type']}\n".encode())
+
+        edges = np.array(
+            [sorted((node_to_pos[u], node_to_pos[v])) for u, v in G.edges()],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        edges = edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+        digest.update(edges.tobytes())
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def hash_payload(payload: Dict) -> str:
+        encoded = json.dumps(payload, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def build_lineage(self, kernel: MarkovKernel) -> str:
+        # Everything in the key but the graph: snapshots sharing a lineage
+        # supersede each other as the graph evolves.
+        payload = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "strategy": kernel.strategy.value if kernel.strategy else None,
+            "type_transition_matrix": kernel.type_transition_matrix,
+            "sparse": kernel.sparse,
+            "dtype": kernel.dtype.name,
+        }
+        return self.hash_payload(payload)
+
+    def build_key(self, kernel: MarkovKernel) -> str:
+        payload = {
+            "lineage": self.build_lineage(kernel),
+            "graph": self.fingerprint_graph(kernel.G),
+        }
+        return self.hash_payload(payload)
+
+    def get_path(self, key: str) -> Path:
+        return self.root / key
+
+    def exists(self, key: str) -> bool:
+        return (self.get_path(key) / "meta.json").exists()
+
+    def remove(self, key: str) -> None:
+        shutil.rmtree(self.get_path(key), ignore_errors=True)
+
+    def list_snapshots(self) -> List[Dict]:
+        if not self.root.exists():
+            return []
+
+        snapshots = []
+        for path in self.root.iterdir():
+            # Skips the temporary directories of in-flight writers
+            if path.name.startswith(".") or not path.is_dir():
+                continue
+
+            try:
+                snapshots.append({**self.read_meta(path.name), "key": path.name})
+            except (OSError, ValueError):
+                continue
+
+        return snapshots
+
+    def prune(self, lineage: str, current_key: str) -> None:
+        snapshots = [
+            meta
+            for meta in self.list_snapshots()
+            if meta.get("key") != current_key
+            and (
+                meta.get("format_version") != SNAPSHOT_FORMAT_VERSION
+                or meta.get("lineage") == lineage
+            )
+        ]
+        superseded = sorted(
+            (meta for meta in snapshots if meta.get("lineage") == lineage),
+            key=lambda meta: meta.get("created_at", 0.0),
+            reverse=True,
+        )[: self.keep - 1]
+        kept = {meta["key"] for meta in superseded}
+
+        for meta in snapshots:
+            if meta.get("key") in kept:
+                continue
+
+            logger.info(f"Removing superseded kernel snapshot {meta.get('key')}")
+            self.remove(meta["key"])
+
+    def save(self, key: str, kernel: MarkovKernel) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        lineage = self.build_lineage(kernel)
+        tmp_path = Path(tempfile.mkdtemp(dir=self.root, prefix=f".{key}."))
+
+        try:
+            if issparse(kernel.P):
+                np.save(tmp_path / "data.npy", kernel.P.data)
+                np.save(tmp_path / "indices.npy", kernel.P.indices)
+                np.save(tmp_path / "indptr.npy", kernel.P.indptr)
+            else:
+                np.save(tmp_path / "P.npy", kernel.P)
+
+            np.save(tmp_path / "nodes.npy", np.array(list(kernel.index.nodes)))
+            np.save(tmp_path / "node_types.npy", kernel.node_types)
+
+            meta = {
+                "key": key,
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "lineage": lineage,
+                "created_at": time.time(),
+                "n": kernel.index.n,
+                "sparse": kernel.sparse,
+            }
+            with open(tmp_path / "meta.json", "w") as f:
+                json.dump(meta, f)
+
+            self.publish(key, tmp_path)
+
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        self.prune(lineage, key)
+
+    def publish(self, key: str, tmp_path: Path) -> None:
+        path = self.get_path(key)
+
+        # A key fully determines its content, so a complete snapshot written by
+        # a concurrent builder is as good as ours.
+        if self.exists(key):
+            return
+
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.replace(tmp_path, path)
+
+        except OSError:
+            if not self.exists(key):
+                raise
+
+    def read_meta(self, key: str) -> Dict:
+        with open(self.get_path(key) / "meta.json", "r") as f:
+            return json.load(f)
+
+    def load(self, key: str, kernel: MarkovKernel) -> None:
+        path = self.get_path(key)
+        meta = self.read_meta(key)
+
+        if meta["key"] != key or meta["format_version"] != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Snapshot {key} does not match the requested kernel")
+
+        n = meta["n"]
+        if meta["sparse"]:
+            P = csr_array(
+                (
+                    np.load(path / "data.npy", mmap_mode="r"),
+                    np.load(path / "indices.npy", mmap_mode="r"),
+                    np.load(path / "indptr.npy", mmap_mode="r"),
+                ),
+                shape=(n, n),
+                copy=False,
+            )
+        else:
+            P = np.load(path / "P.npy", mmap_mode="r")
+
+        nodes = np.load(path / "nodes.npy", mmap_mode="r")
+        if len(nodes) != n:
+            raise ValueError(f"Snapshot {key} is truncated")
+
+        kernel.P = P
+        kernel.index = NodeIndex(nodes.tolist())
+        kernel.node_types = np.load(path / "node_types.npy", mmap_mode="r")
+
+    def load_or_build(self, kernel: MarkovKernel) -> MarkovKernel:
+        key = self.build_key(kernel)
+
+        if self.exists(key):
+            try:
+                self.load(key, kernel)
+                logger.info(f"Loaded kernel snapshot {key}")
+                return kernel
+
+            except (OSError, ValueError) as e:
+                logger.warning(f"Discarding unreadable kernel snapshot {key}: {e}")
+                self.remove(key)
+
+        logger.info(f"Building kernel snapshot {key}...")
+        kernel.build_kernel()
+        self.save(key, kernel)
+
+        return kernel
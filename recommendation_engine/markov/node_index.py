@@ -3,7 +3,17 @@ from typing import List
 
 class NodeIndex:
     def __init__(self, nodes: List[str]):
-        self.nodes = nodes
-        self.n = len(nodes)
-        self.node_to_idx = {n: i for i, n in enumerate(nodes)}
+        self.nodes = list(nodes)
+        self.n = len(self.nodes)
+        self.node_to_idx = {n: i for i, n in enumerate(self.nodes)}
         self.idx_to_node = {i: n for n, i in self.node_to_idx.items()}
+
+    def extend(self, nodes: List[str]) -> None:
+        for node in nodes:
+            if node in self.node_to_idx:
+                continue
+
+            self.node_to_idx[node] = self.n
+            self.idx_to_node[self.n] = node
+            self.nodes.append(node)
+            self.n += 1
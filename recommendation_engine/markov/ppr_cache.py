@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+SparseVector = Tuple[ndarray, ndarray]
+
+
+class PPRCache:
+    # Single-seed PPR vectors, stored sparse after dropping entries below
+    # threshold and evicted least-recently-used first once their arrays exceed
+    # max_bytes. PPR is linear in pi0, so any seed set is a weighted sum of them.
+    def __init__(self, max_bytes: int = 256 * 2**20, threshold: float = 1e-7):
+        self.max_bytes = int(max_bytes)
+        self.threshold = float(threshold)
+
+        self.entries: "OrderedDict[int, SparseVector]" = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def truncate(self, scores: ndarray) -> SparseVector:
+        indices = np.flatnonzero(scores >= self.threshold)
+        index_dtype = np.int32 if len(scores) < 2**31 else np.int64
+
+        return indices.astype(index_dtype), scores[indices]
+
+    @staticmethod
+    def get_size(vector: SparseVector) -> int:
+        indices, values = vector
+        return indices.nbytes + values.nbytes
+
+    def get(self, node: int) -> Optional[SparseVector]:
+        with self.lock:
+            vector = self.entries.get(node)
+            if vector is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(node)
+            self.hits += 1
+            return vector
+
+    def get_many(
+        self, nodes: Iterable[int]
+    ) -> Tuple[Dict[int, SparseVector], List[int]]:
+        found, missing = {}, []
+
+        for node in nodes:
+            vector = self.get(int(node))
+            if vector is None:
+                missing.append(int(node))
+            else:
+                found[int(node)] = vector
+
+        return found, missing
+
+    def put(self, node: int, scores: ndarray) -> SparseVector:
+        vector = self.truncate(scores)
+        size = self.get_size(vector)
+
+        with self.lock:
+            if size > self.max_bytes:
+                return vector
+
+            previous = self.entries.pop(node, None)
+            if previous is not None:
+                self.nbytes -= self.get_size(previous)
+
+            self.entries[node] = vector
+            self.nbytes += size
+
+            while self.nbytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= self.get_size(evicted)
+
+        return vector
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "nbytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
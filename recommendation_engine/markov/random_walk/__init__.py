@@ -2,9 +2,25 @@ from recommendation_engine.markov.random_walk.factory import (  # noqa: F401, E4
     RandomWalkBase,
     RandomWalkFactory,
 )
+from recommendation_engine.markov.random_walk.forward_push import (  # noqa: F401, E402
+    ForwardPushRW,
+)
+from recommendation_engine.markov.random_walk.linear_solver import (  # noqa: F401, E402, E501
+    LinearSolverRW,
+)
+from recommendation_engine.markov.random_walk.low_rank import (  # noqa: F401, E402
+    LowRankResolvent,
+    LowRankRW,
+)
 from recommendation_engine.markov.random_walk.monte_carlo import (  # noqa: F401, E402
     MonteCarloRW,
 )
+from recommendation_engine.markov.random_walk.monte_carlo_ppr import (  # noqa: F401, E402, E501
+    MonteCarloPPRRW,
+)
 from recommendation_engine.markov.random_walk.power_iteration import (  # noqa: F401, E402, E501
     PowerIterationRW,
 )
+from recommendation_engine.markov.random_walk.walker import (  # noqa: F401, E402
+    WalkerEngine,
+)
@@ -1,9 +1,16 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
 from numpy import ndarray
 
 
 class RandomWalkBase(ABC):
+    stats = None
+
     @abstractmethod
     def run(self) -> ndarray:
         pass
+
+    def get_iterations(self) -> Optional[int]:
+        # Work done by the last run, in the engine's own unit
+        return None if self.stats is None else self.stats.iterations
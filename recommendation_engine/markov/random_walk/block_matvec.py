@@ -0,0 +1,64 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+from numpy import ndarray
+from scipy.sparse import csr_array
+
+from recommendation_engine.markov.kernel import KernelMatrix
+
+_EXECUTORS: Dict[int, ThreadPoolExecutor] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def get_executor(n_threads: int) -> ThreadPoolExecutor:
+    # One pool per thread count, shared by every kernel
+    with _EXECUTORS_LOCK:
+        if n_threads not in _EXECUTORS:
+            _EXECUTORS[n_threads] = ThreadPoolExecutor(
+                max_workers=n_threads, thread_name_prefix="block_matvec"
+            )
+
+        return _EXECUTORS[n_threads]
+
+
+def split_rows(A: csr_array, n_blocks: int) -> List[Tuple[int, int]]:
+    # Row ranges holding about the same number of stored entries each
+    targets = np.linspace(0, A.nnz, n_blocks + 1)
+    bounds = np.unique(np.searchsorted(A.indptr, targets[1:-1]))
+    edges = np.concatenate([[0], bounds, [A.shape[0]]])
+
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+class BlockMatvec:
+    # P^T split into row blocks of equal nnz, multiplied on a thread pool.
+    # SciPy's sparse kernels release the GIL, so the blocks run in parallel.
+    def __init__(self, P: KernelMatrix, n_threads: int):
+        PT = csr_array(P.T)
+
+        self.n = PT.shape[0]
+        self.dtype = PT.dtype
+        self.n_threads = int(n_threads)
+        self.blocks = [
+            (start, stop, PT[start:stop]) for start, stop in split_rows(PT, n_threads)
+        ]
+
+    @staticmethod
+    def run_block(block: csr_array, x: ndarray, out: ndarray) -> None:
+        out[...] = block @ x
+
+    def apply_transposed(self, x: ndarray) -> ndarray:
+        # P^T @ x, which is x @ P for a row vector
+        out = np.empty((self.n,) + x.shape[1:], dtype=np.result_type(x, self.dtype))
+        executor = get_executor(self.n_threads)
+
+        futures = [
+            executor.submit(self.run_block, block, x, out[start:stop])
+            for start, stop, block in self.blocks
+        ]
+        for future in futures:
+            future.result()
+
+        return out
@@ -1,37 +1,124 @@
-from typing import List
+from typing import List, Optional
 
+import numpy as np
 from numpy import ndarray
 
 from recommendation_engine.markov.initial_distribution import InitialDistributionBuilder
+from recommendation_engine.markov.kernel import KernelMatrix
 from recommendation_engine.markov.node_index import NodeIndex
 from recommendation_engine.markov.random_walk.base import RandomWalkBase
+from recommendation_engine.markov.random_walk.forward_push import ForwardPushRW
+from recommendation_engine.markov.random_walk.linear_solver import LinearSolverRW
+from recommendation_engine.markov.random_walk.low_rank import LowRankRW
 from recommendation_engine.markov.random_walk.monte_carlo import MonteCarloRW
+from recommendation_engine.markov.random_walk.monte_carlo_ppr import MonteCarloPPRRW
 from recommendation_engine.markov.random_walk.power_iteration import PowerIterationRW
 from settings.config_loader import load_random_walk_parameters
-from settings.constants import RandomWalkStrategy
+from settings.constants import PowerIterationSolver, RandomWalkStrategy
 
 RW_CONFIG = load_random_walk_parameters()
 
 
 class RandomWalkFactory:
+    @staticmethod
+    def create_power_iteration(
+        P: KernelMatrix,
+        pi0: ndarray,
+        x0: Optional[ndarray] = None,
+        top_k: Optional[int] = None,
+        candidates: Optional[ndarray] = None,
+    ) -> PowerIterationRW:
+        cfg = RW_CONFIG[RandomWalkStrategy.POWER_ITERATION]
+
+        return PowerIterationRW(
+            P=P,
+            pi0=pi0,
+            alpha=cfg["alpha"],
+            tol=cfg["tol"],
+            max_iter=cfg["max_iter"],
+            solver=cfg.get("solver", PowerIterationSolver.JACOBI),
+            anderson_depth=cfg.get("anderson_depth", 5),
+            extrapolation_period=cfg.get("extrapolation_period", 10),
+            n_threads=cfg.get("n_threads", 1),
+            x0=x0,
+            top_k=top_k,
+            candidates=candidates,
+        )
+
+    @staticmethod
+    def create_linear_solver(
+        P: KernelMatrix, pi0: ndarray, x0: Optional[ndarray] = None
+    ) -> LinearSolverRW:
+        cfg = RW_CONFIG[RandomWalkStrategy.LINEAR_SOLVER]
+
+        return LinearSolverRW(
+            P=P,
+            pi0=pi0,
+            alpha=cfg["alpha"],
+            method=cfg["method"],
+            preconditioner=cfg["preconditioner"],
+            tol=cfg["tol"],
+            max_iter=cfg["max_iter"],
+            drop_tol=cfg["drop_tol"],
+            fill_factor=cfg["fill_factor"],
+            x0=x0,
+        )
+
+    @staticmethod
+    def create_low_rank(P: KernelMatrix, pi0: ndarray) -> LowRankRW:
+        cfg = RW_CONFIG[RandomWalkStrategy.LOW_RANK]
+
+        return LowRankRW(
+            P=P,
+            pi0=pi0,
+            alpha=cfg["alpha"],
+            rank=cfg["rank"],
+            oversampling=cfg["oversampling"],
+            power_iterations=cfg["power_iterations"],
+            exact_hops=cfg["exact_hops"],
+            tol=cfg["tol"],
+            random_state=cfg["random_state"],
+        )
+
+    @staticmethod
+    def create_exact(
+        method: RandomWalkStrategy,
+        P: KernelMatrix,
+        pi0: ndarray,
+        x0: Optional[ndarray] = None,
+        top_k: Optional[int] = None,
+        candidates: Optional[ndarray] = None,
+    ) -> RandomWalkBase:
+        if method == RandomWalkStrategy.POWER_ITERATION:
+            return RandomWalkFactory.create_power_iteration(
+                P, pi0, x0, top_k, candidates
+            )
+
+        if method == RandomWalkStrategy.LINEAR_SOLVER:
+            return RandomWalkFactory.create_linear_solver(P, pi0, x0)
+
+        raise ValueError(f"{method} does not solve from a restart vector")
+
     @staticmethod
     def create(
         method: RandomWalkStrategy,
-        P: ndarray,
+        P: KernelMatrix,
         index: NodeIndex,
         seeds: List[str],
+        x0: Optional[ndarray] = None,
+        top_k: Optional[int] = None,
+        candidates: Optional[ndarray] = None,
     ) -> RandomWalkBase:
-        if method == RandomWalkStrategy.POWER_ITERATION:
-            cfg = RW_CONFIG[RandomWalkStrategy.POWER_ITERATION]
-            pi0 = InitialDistributionBuilder(seeds, index).build()
+        if method in (
+            RandomWalkStrategy.POWER_ITERATION,
+            RandomWalkStrategy.LINEAR_SOLVER,
+        ):
+            pi0 = InitialDistributionBuilder(seeds, index, dtype=P.dtype).build()
+            return RandomWalkFactory.create_exact(method, P, pi0, x0, top_k, candidates)
 
-            return PowerIterationRW(
-                P=P,
-                pi0=pi0,
-                alpha=cfg["alpha"],
-                tol=cfg["tol"],
-                max_iter=cfg["max_iter"],
-            )
+        if method == RandomWalkStrategy.LOW_RANK:
+            pi0 = InitialDistributionBuilder(seeds, index, dtype=P.dtype).build()
+            return RandomWalkFactory.create_low_rank(P, pi0)
 
         if method == RandomWalkStrategy.MONTE_CARLO:
             cfg = RW_CONFIG[RandomWalkStrategy.MONTE_CARLO]
@@ -41,6 +128,59 @@ class RandomWalkFactory:
                 index=index,
                 seed_nodes=seeds,
                 steps=cfg["steps"],
+                walkers=cfg.get("walkers", 1),
+                random_state=cfg.get("random_state"),
+            )
+
+        if method == RandomWalkStrategy.MONTE_CARLO_PPR:
+            cfg = RW_CONFIG[RandomWalkStrategy.MONTE_CARLO_PPR]
+
+            return MonteCarloPPRRW(
+                P=P,
+                index=index,
+                seed_nodes=seeds,
+                alpha=cfg["alpha"],
+                walks=cfg["walks"],
+                batch_size=cfg["batch_size"],
+                workers=cfg["workers"],
+                confidence=cfg["confidence"],
+                random_state=cfg["random_state"],
+            )
+
+        if method == RandomWalkStrategy.FORWARD_PUSH:
+            cfg = RW_CONFIG[RandomWalkStrategy.FORWARD_PUSH]
+
+            return ForwardPushRW(
+                P=P,
+                index=index,
+                seed_nodes=seeds,
+                alpha=cfg["alpha"],
+                epsilon=cfg["epsilon"],
             )
 
         raise ValueError(f"Unknown method {method}")
+
+    @staticmethod
+    def create_batch(
+        method: RandomWalkStrategy,
+        P: KernelMatrix,
+        index: NodeIndex,
+        seed_sets: List[List[str]],
+    ) -> RandomWalkBase:
+        pi0 = np.stack(
+            [
+                InitialDistributionBuilder(seeds, index, dtype=P.dtype).build()
+                for seeds in seed_sets
+            ]
+        )
+
+        if method in (
+            RandomWalkStrategy.POWER_ITERATION,
+            RandomWalkStrategy.LINEAR_SOLVER,
+        ):
+            return RandomWalkFactory.create_exact(method, P, pi0)
+
+        if method == RandomWalkStrategy.LOW_RANK:
+            return RandomWalkFactory.create_low_rank(P, pi0)
+
+        raise ValueError(f"Batched random walks are not supported for {method}")
@@ -0,0 +1,41 @@
+import threading
+import weakref
+from typing import Any, Callable, Dict, Tuple
+
+from recommendation_engine.markov.kernel import KernelMatrix
+
+
+class KernelCache:
+    # Per-kernel derived data (degrees, splittings, factorizations...), keyed by
+    # the identity of the kernel matrix and dropped once the matrix is garbage
+    # collected, so a recomposed or refreshed kernel never sees stale entries.
+    def __init__(self):
+        self.entries: Dict[Tuple[int, str], Any] = {}
+        self.lock = threading.Lock()
+
+    def get(self, P: KernelMatrix, name: str, build: Callable[[], Any]) -> Any:
+        key = (id(P), name)
+
+        with self.lock:
+            if key in self.entries:
+                return self.entries[key]
+
+        value = build()
+
+        with self.lock:
+            if not any(kernel_id == id(P) for kernel_id, _ in self.entries):
+                weakref.finalize(P, self.evict, id(P))
+
+            return self.entries.setdefault(key, value)
+
+    def evict(self, kernel_id: int) -> None:
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == kernel_id]:
+                del self.entries[key]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+KERNEL_CACHE = KernelCache()
@@ -0,0 +1,168 @@
+import time
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse import csc_array, csr_array, eye_array, issparse
+from scipy.sparse.linalg import LinearOperator, bicgstab, gmres, spilu, splu
+
+from recommendation_engine.markov.kernel import KernelMatrix
+from recommendation_engine.markov.random_walk.base import RandomWalkBase
+from recommendation_engine.markov.random_walk.kernel_cache import KERNEL_CACHE
+from recommendation_engine.markov.random_walk.power_iteration import SolverStats
+from settings.constants import LinearSolverMethod, Preconditioner
+
+Solve = Callable[[ndarray], ndarray]
+
+
+def build_system_matrix(P: KernelMatrix, alpha: float) -> KernelMatrix:
+    # Personalized PageRank solves (I - (1 - alpha) P^T) pi^T = alpha pi0^T
+    if issparse(P):
+        A = eye_array(P.shape[0], dtype=P.dtype) - (1 - alpha) * csr_array(P.T)
+        return csr_array(A)
+
+    return np.eye(len(P), dtype=P.dtype) - (1 - alpha) * P.T
+
+
+class LinearSolverRW(RandomWalkBase):
+    def __init__(
+        self,
+        P: KernelMatrix,
+        pi0: ndarray,
+        alpha: float = 0.15,
+        method: LinearSolverMethod = LinearSolverMethod.GMRES,
+        preconditioner: Preconditioner = Preconditioner.JACOBI,
+        tol: float = 1e-10,
+        max_iter: int = 1000,
+        drop_tol: float = 1e-4,
+        fill_factor: float = 10,
+        x0: Optional[ndarray] = None,
+    ):
+        self.P = P
+        self.pi0 = pi0.astype(P.dtype, copy=False)
+        self.alpha = float(alpha)
+        self.method = LinearSolverMethod(method)
+        self.preconditioner = Preconditioner(preconditioner)
+        self.tol = max(float(tol), 10 * np.finfo(P.dtype).eps)
+        self.max_iter = int(max_iter)
+        self.drop_tol = float(drop_tol)
+        self.fill_factor = float(fill_factor)
+        self.max_restarts = 3
+        self.x0 = x0 if x0 is not None and x0.shape == self.pi0.shape else None
+        self.stats = None
+
+    def get_system_matrix(self) -> KernelMatrix:
+        return KERNEL_CACHE.get(
+            self.P,
+            f"linear_system:{self.alpha}",
+            lambda: build_system_matrix(self.P, self.alpha),
+        )
+
+    def factorize(self) -> Solve:
+        A = self.get_system_matrix()
+
+        if issparse(A):
+            return splu(csc_array(A)).solve
+
+        factors = lu_factor(A)
+        return lambda b: lu_solve(factors, b)
+
+    def get_factorization(self) -> Solve:
+        # Factorized once per kernel: every later seed set is a pair of
+        # triangular solves.
+        return KERNEL_CACHE.get(self.P, f"splu:{self.alpha}", self.factorize)
+
+    def build_preconditioner(self) -> Optional[LinearOperator]:
+        A = self.get_system_matrix()
+
+        if self.preconditioner == Preconditioner.NONE:
+            return None
+
+        if self.preconditioner == Preconditioner.JACOBI:
+            inverse_diagonal = 1.0 / A.diagonal()
+            return LinearOperator(
+                A.shape, matvec=lambda x: inverse_diagonal * x, dtype=A.dtype
+            )
+
+        ilu = spilu(csc_array(A), drop_tol=self.drop_tol, fill_factor=self.fill_factor)
+        return LinearOperator(A.shape, matvec=ilu.solve, dtype=A.dtype)
+
+    def get_preconditioner(self) -> Optional[LinearOperator]:
+        key = f"preconditioner:{self.preconditioner.value}:{self.alpha}"
+        if self.preconditioner == Preconditioner.ILU:
+            key = f"{key}:{self.drop_tol}:{self.fill_factor}"
+
+        return KERNEL_CACHE.get(self.P, key, self.build_preconditioner)
+
+    def solve_krylov(
+        self, b: ndarray, x0: Optional[ndarray] = None
+    ) -> Tuple[ndarray, int, bool]:
+        A = self.get_system_matrix()
+        iterations = 0
+
+        def count(_) -> None:
+            nonlocal iterations
+            iterations += 1
+
+        kwargs = dict(rtol=self.tol, atol=0.0, M=self.get_preconditioner())
+        x = x0
+
+        # BiCGSTAB can break down (rho ~ 0) close to the solution, in which case
+        # it is restarted from the last iterate.
+        for _ in range(self.max_restarts):
+            if self.method == LinearSolverMethod.GMRES:
+                x, info = gmres(
+                    A,
+                    b,
+                    x0=x,
+                    maxiter=self.max_iter,
+                    callback=count,
+                    callback_type="pr_norm",
+                    **kwargs,
+                )
+            else:
+                x, info = bicgstab(
+                    A, b, x0=x, maxiter=self.max_iter, callback=count, **kwargs
+                )
+
+            if info >= 0:
+                break
+
+        if info < 0:
+            raise ValueError(f"{self.method.value} broke down (info={info})")
+
+        return x, iterations, info == 0
+
+    def run(self) -> ndarray:
+        pi, self.stats = self.run_with_stats()
+        return pi
+
+    def run_with_stats(self) -> Tuple[ndarray, SolverStats]:
+        stats = SolverStats(solver=self.method)
+        start = time.perf_counter()
+
+        # Right-hand sides as columns, one per seed set
+        B = self.alpha * np.atleast_2d(self.pi0).T
+
+        if self.method == LinearSolverMethod.SPLU:
+            X = self.get_factorization()(np.ascontiguousarray(B))
+            stats.column_iterations = np.ones(B.shape[1], dtype=np.int64)
+            stats.converged = True
+        else:
+            # Krylov methods take the previous solution as their initial guess
+            X0 = [None] * B.shape[1] if self.x0 is None else np.atleast_2d(self.x0)
+            columns = [self.solve_krylov(b, x0) for b, x0 in zip(B.T, X0)]
+            X = np.stack([x for x, _, _ in columns], axis=1)
+            stats.column_iterations = np.array([it for _, it, _ in columns])
+            stats.converged = all(converged for _, _, converged in columns)
+
+        # L1 residual of each seed set's system, for comparison with the
+        # power iteration residuals
+        residuals = np.abs(self.get_system_matrix() @ X - B).sum(axis=0)
+        stats.iterations = int(stats.column_iterations.sum())
+        stats.residuals = residuals.tolist()
+        stats.wall_time = time.perf_counter() - start
+
+        pi = X.T.astype(self.P.dtype, copy=False)
+        return (pi[0] if self.pi0.ndim == 1 else pi), stats
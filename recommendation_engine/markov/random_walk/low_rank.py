@@ -0,0 +1,210 @@
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+from scipy.sparse import csr_array, issparse
+
+from recommendation_engine.markov.kernel import KernelMatrix
+from recommendation_engine.markov.random_walk.base import RandomWalkBase
+from recommendation_engine.markov.random_walk.kernel_cache import KERNEL_CACHE
+from recommendation_engine.markov.random_walk.power_iteration import (
+    PowerIterationRW,
+    SolverStats,
+)
+
+LowRankFactors = Tuple[ndarray, ndarray]
+
+
+@dataclass
+class LowRankAccuracy:
+    rank: int
+    top_k: int
+    overlap: float
+    min_overlap: float
+    l1_error: float
+
+
+def get_top_k(
+    scores: ndarray, top_k: int, candidates: Optional[ndarray], seeds: ndarray
+) -> ndarray:
+    indices = np.arange(len(scores)) if candidates is None else candidates
+    indices = indices[~seeds[indices]]
+
+    k = min(top_k, len(indices))
+    return indices[np.argpartition(-scores[indices], k - 1)[:k]]
+
+
+class LowRankResolvent:
+    # Randomized truncated SVD of the PPR operator past its first exact_hops
+    # terms, M = alpha sum_{j >= h} (1 - alpha)^j P^j, so that
+    #   pi = alpha pi0 sum_{j < h} (1 - alpha)^j P^j + pi0 M
+    # with M ~ left @ right. The leading terms hold the seed-local mass that a
+    # low rank cannot represent, and stay cheap since pi0 is sparse.
+    def __init__(
+        self,
+        P: KernelMatrix,
+        alpha: float = 0.15,
+        rank: int = 64,
+        oversampling: int = 10,
+        power_iterations: int = 1,
+        exact_hops: int = 2,
+        tol: float = 1e-8,
+        random_state: Optional[int] = None,
+    ):
+        self.P = P
+        self.alpha = float(alpha)
+        self.rank = int(rank)
+        self.oversampling = int(oversampling)
+        self.power_iterations = int(power_iterations)
+        self.exact_hops = int(exact_hops)
+        self.tol = float(tol)
+        self.random_state = random_state
+
+    def neumann(self, A: KernelMatrix, Z: ndarray) -> ndarray:
+        # sum_j (1 - alpha)^j A^j Z, where A is P or P^T
+        total = term = Z
+        while np.abs(term).max(initial=0.0) > self.tol * np.abs(total).max():
+            term = (1 - self.alpha) * (A @ term)
+            total = total + term
+
+        return total
+
+    def hops(self, A: KernelMatrix, Z: ndarray) -> ndarray:
+        for _ in range(self.exact_hops):
+            Z = (1 - self.alpha) * (A @ Z)
+
+        return Z
+
+    def apply(self, Z: ndarray) -> ndarray:
+        return self.alpha * self.hops(self.P, self.neumann(self.P, Z))
+
+    def apply_transposed(self, Z: ndarray) -> ndarray:
+        PT = self.P.T
+        return self.alpha * self.neumann(PT, self.hops(PT, Z))
+
+    def factorize(self) -> LowRankFactors:
+        n = self.P.shape[0]
+        width = min(self.rank + self.oversampling, n)
+        rng = np.random.default_rng(self.random_state)
+
+        # Range finder on the columns of M, refined by subspace iterations
+        Q, _ = np.linalg.qr(self.apply(rng.standard_normal((n, width))))
+        for _ in range(self.power_iterations):
+            Q, _ = np.linalg.qr(self.apply_transposed(Q))
+            Q, _ = np.linalg.qr(self.apply(Q))
+
+        B = self.apply_transposed(Q).T
+        U, s, Vt = np.linalg.svd(B, full_matrices=False)
+
+        k = min(self.rank, len(s))
+        left = (Q @ U[:, :k]) * s[:k]
+        return left.astype(self.P.dtype), Vt[:k].astype(self.P.dtype)
+
+    def get_factors(self) -> LowRankFactors:
+        key = (
+            f"low_rank:{self.alpha}:{self.rank}:{self.oversampling}:"
+            f"{self.power_iterations}:{self.exact_hops}:{self.random_state}"
+        )
+        return KERNEL_CACHE.get(self.P, key, self.factorize)
+
+    def get_exact_terms(self, pi0: ndarray) -> ndarray:
+        pi, term = np.zeros_like(pi0), self.alpha * pi0
+        for _ in range(self.exact_hops):
+            pi = pi + term
+            term = (1 - self.alpha) * (term @ self.P)
+
+        return pi
+
+    def scores(self, pi0: ndarray, rank: Optional[int] = None) -> ndarray:
+        left, right = self.get_factors()
+        k = left.shape[1] if rank is None else min(rank, left.shape[1])
+
+        seeds = np.flatnonzero(np.atleast_2d(pi0).any(axis=0))
+        weights = np.atleast_2d(pi0)[:, seeds] @ left[seeds, :k]
+
+        pi = self.get_exact_terms(pi0) + (weights @ right[:k]).reshape(pi0.shape)
+        return pi.astype(self.P.dtype, copy=False)
+
+    def evaluate(
+        self,
+        pi0: ndarray,
+        ranks: List[int],
+        top_k: int = 10,
+        candidates: Optional[ndarray] = None,
+    ) -> List[LowRankAccuracy]:
+        # Top-k overlap and L1 error against exact power iteration for each
+        # rank up to the factorized one (the truncated SVDs are nested), seeds
+        # excluded since they are never recommended.
+        pi0 = np.atleast_2d(pi0)
+        exact = PowerIterationRW(self.P, pi0, alpha=self.alpha, tol=1e-12).run()
+        seeds = pi0 > 0
+        exact[seeds] = 0
+
+        report = []
+        for rank in sorted(ranks):
+            approx = self.scores(pi0, rank)
+            approx[seeds] = 0
+
+            overlaps = [
+                len(
+                    np.intersect1d(
+                        get_top_k(e, top_k, candidates, s),
+                        get_top_k(a, top_k, candidates, s),
+                    )
+                )
+                / top_k
+                for e, a, s in zip(exact, approx, seeds)
+            ]
+            report.append(
+                LowRankAccuracy(
+                    rank=min(rank, self.rank),
+                    top_k=top_k,
+                    overlap=float(np.mean(overlaps)),
+                    min_overlap=float(np.min(overlaps)),
+                    l1_error=float(np.abs(exact - approx).sum(axis=1).mean()),
+                )
+            )
+
+        return report
+
+
+class LowRankRW(RandomWalkBase):
+    def __init__(
+        self,
+        P: KernelMatrix,
+        pi0: ndarray,
+        alpha: float = 0.15,
+        rank: int = 64,
+        oversampling: int = 10,
+        power_iterations: int = 1,
+        exact_hops: int = 2,
+        tol: float = 1e-8,
+        random_state: Optional[int] = 0,
+    ):
+        self.P = P if issparse(P) else KERNEL_CACHE.get(P, "csr", lambda: csr_array(P))
+        self.pi0 = pi0.astype(P.dtype, copy=False)
+        self.resolvent = LowRankResolvent(
+            self.P,
+            alpha=alpha,
+            rank=rank,
+            oversampling=oversampling,
+            power_iterations=power_iterations,
+            exact_hops=exact_hops,
+            tol=tol,
+            random_state=random_state,
+        )
+        self.stats = None
+
+    def prepare(self) -> None:
+        # Factorizes ahead of serving, otherwise the first run pays for it
+        self.resolvent.get_factors()
+
+    def run(self) -> ndarray:
+        start = time.perf_counter()
+        pi = self.resolvent.scores(self.pi0)
+
+        self.stats = SolverStats(solver=None, converged=True)
+        self.stats.wall_time = time.perf_counter() - start
+        return pi
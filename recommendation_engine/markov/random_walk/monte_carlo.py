@@ -1,41 +1,44 @@
-from typing import List
+from typing import List, Optional
 
 import numpy as np
 from numpy import ndarray
 
+from recommendation_engine.markov.kernel import KernelMatrix
 from recommendation_engine.markov.node_index import NodeIndex
 from recommendation_engine.markov.random_walk.base import RandomWalkBase
+from recommendation_engine.markov.random_walk.walker import WalkerEngine
 
 
 class MonteCarloRW(RandomWalkBase):
     def __init__(
-        self, P: ndarray, index: NodeIndex, seed_nodes: List[str], steps: int = 1000
+        self,
+        P: KernelMatrix,
+        index: NodeIndex,
+        seed_nodes: List[str],
+        steps: int = 1000,
+        walkers: int = 1,
+        random_state: Optional[int] = None,
     ):
         self.P = P
         self.index = index
         self.seed_nodes = seed_nodes
         self.steps = int(steps)
+        self.walkers = int(walkers)
+        self.rng = np.random.default_rng(random_state)
+        self.engine = WalkerEngine.for_kernel(self.P)
 
     def sample_random_walk(self, start_node: str) -> List[str]:
-        current = start_node
-        walk = [current]
-
-        for _ in range(self.steps):
-            neighbors_idx = np.where(self.P[self.index.node_to_idx[current], :] > 0)[0]
-            probs = self.P[self.index.node_to_idx[current], neighbors_idx]
-            probs /= probs.sum()
-            current = self.index.idx_to_node[np.random.choice(neighbors_idx, p=probs)]
-            walk.append(current)
-
-        return walk
+        path = self.engine.sample_path(
+            self.index.node_to_idx[start_node], self.steps, self.rng
+        )
+        return [self.index.idx_to_node[i] for i in path.tolist()]
 
     def run(self) -> ndarray:
-        counts = np.zeros(self.index.n)
-
-        for start in self.seed_nodes:
-            walk = self.sample_random_walk(start)
-
-            for node in walk:
-                counts[self.index.node_to_idx[node]] += 1
+        seeds = np.array([self.index.node_to_idx[n] for n in self.seed_nodes])
+        starts = np.repeat(seeds, self.walkers)
 
+        counts = self.engine.count_visits(starts, self.steps, self.rng)
         return counts / counts.sum()
+
+    def get_iterations(self) -> Optional[int]:
+        return self.steps
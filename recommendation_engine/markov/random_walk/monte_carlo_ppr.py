@@ -0,0 +1,191 @@
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+from numpy.random import SeedSequence
+from scipy.sparse import csr_array, issparse
+from scipy.stats import t as student_t
+
+from recommendation_engine.markov.initial_distribution import InitialDistributionBuilder
+from recommendation_engine.markov.kernel import KernelMatrix
+from recommendation_engine.markov.node_index import NodeIndex
+from recommendation_engine.markov.random_walk.base import RandomWalkBase
+from recommendation_engine.markov.random_walk.kernel_cache import KERNEL_CACHE
+from recommendation_engine.markov.random_walk.walker import WalkerEngine
+
+_WORKER_ENGINE = None
+
+
+def _init_worker(P: csr_array) -> None:
+    global _WORKER_ENGINE
+    _WORKER_ENGINE = WalkerEngine(P)
+
+
+def build_worker_pool(P: csr_array, workers: int) -> ProcessPoolExecutor:
+    # The kernel is shipped to each worker once, when the pool starts, and the
+    # pool lives as long as the kernel
+    pool = ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(P,)
+    )
+    weakref.finalize(P, pool.shutdown, wait=False)
+    return pool
+
+
+def _run_worker_batch(
+    args: Tuple[ndarray, ndarray, int, float, SeedSequence],
+) -> Tuple[ndarray, ndarray]:
+    return simulate_walks(_WORKER_ENGINE, *args)
+
+
+def simulate_walks(
+    engine: WalkerEngine,
+    seeds: ndarray,
+    seed_probs: ndarray,
+    n_walks: int,
+    alpha: float,
+    seed_sequence: SeedSequence,
+) -> Tuple[ndarray, ndarray]:
+    # Each walk starts on a seed drawn from the normalized restart distribution
+    # and stops with probability alpha before every step, so the expected number
+    # of visits to a node is its personalized PageRank divided by alpha.
+    rng = np.random.default_rng(seed_sequence)
+
+    current = seeds[rng.choice(len(seeds), size=n_walks, p=seed_probs)]
+    visits = [current]
+
+    while len(current) > 0:
+        current = current[rng.random(len(current)) >= alpha]
+        if len(current) == 0:
+            break
+
+        current = engine.step(current, rng)
+        visits.append(current)
+
+    return np.unique(np.concatenate(visits), return_counts=True)
+
+
+class MonteCarloPPRRW(RandomWalkBase):
+    def __init__(
+        self,
+        P: KernelMatrix,
+        index: NodeIndex,
+        seed_nodes: List[str],
+        alpha: float = 0.15,
+        walks: int = 100000,
+        batch_size: int = 10000,
+        workers: int = 1,
+        confidence: float = 0.95,
+        random_state: Optional[int] = None,
+    ):
+        self.P = P if issparse(P) else KERNEL_CACHE.get(P, "csr", lambda: csr_array(P))
+        self.index = index
+        self.seed_nodes = seed_nodes
+        self.alpha = float(alpha)
+        self.walks = int(walks)
+        self.batch_size = int(batch_size)
+        self.workers = int(workers)
+        self.confidence = float(confidence)
+        self.random_state = random_state
+
+        self.batch_sizes = []
+        self.batch_visits = []
+        self.restart_mass = 1.0
+        self.scores = None
+
+    def get_seed_weights(self) -> Tuple[ndarray, ndarray]:
+        return InitialDistributionBuilder(
+            self.seed_nodes, self.index
+        ).get_seed_weights()
+
+    def get_batch_sizes(self) -> List[int]:
+        n_batches, remainder = divmod(self.walks, self.batch_size)
+        return [self.batch_size] * n_batches + ([remainder] if remainder else [])
+
+    def run_batches(
+        self, seeds: ndarray, seed_probs: ndarray
+    ) -> List[Tuple[ndarray, ndarray]]:
+        # One independent stream per batch, so the estimate only depends on
+        # random_state and not on how batches are spread over the workers.
+        seed_sequences = SeedSequence(self.random_state).spawn(len(self.batch_sizes))
+        tasks = [
+            (seeds, seed_probs, size, self.alpha, seed_sequence)
+            for size, seed_sequence in zip(self.batch_sizes, seed_sequences)
+        ]
+
+        if self.workers <= 1:
+            engine = WalkerEngine.for_kernel(self.P)
+            return [simulate_walks(engine, *task) for task in tasks]
+
+        return list(self.get_pool().map(_run_worker_batch, tasks))
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        return KERNEL_CACHE.get(
+            self.P,
+            f"walker_pool:{self.workers}",
+            lambda: build_worker_pool(self.P, self.workers),
+        )
+
+    def run(self) -> ndarray:
+        seeds, weights = self.get_seed_weights()
+        self.restart_mass = float(weights.sum())
+        self.batch_sizes = self.get_batch_sizes()
+        self.batch_visits = self.run_batches(seeds, weights / self.restart_mass)
+
+        counts = np.zeros(self.index.n)
+        for nodes, visits in self.batch_visits:
+            counts[nodes] += visits
+
+        # Walks sample the normalized restart distribution, rescaled to the mass
+        # of pi0 so the estimate is on the same scale as PowerIterationRW.
+        self.scores = self.restart_mass * self.alpha * counts / sum(self.batch_sizes)
+        return self.scores
+
+    def get_iterations(self) -> Optional[int]:
+        return len(self.batch_sizes)
+
+    def get_batch_scores(self, nodes: ndarray) -> ndarray:
+        batch_scores = np.zeros((len(self.batch_visits), len(nodes)))
+
+        for b, ((visited, visits), size) in enumerate(
+            zip(self.batch_visits, self.batch_sizes)
+        ):
+            positions = np.searchsorted(visited, nodes)
+            positions = np.minimum(positions, len(visited) - 1)
+            found = visited[positions] == nodes
+            batch_scores[b, found] = visits[positions[found]] / size
+
+        batch_scores *= self.restart_mass * self.alpha
+
+        return batch_scores
+
+    def get_confidence_intervals(
+        self, top_k: int = 10
+    ) -> List[Tuple[str, float, float, float]]:
+        if self.scores is None:
+            raise ValueError("run() must be called before computing intervals")
+
+        if len(self.batch_visits) < 2:
+            raise ValueError("At least two batches are needed for intervals")
+
+        top = np.argsort(-self.scores)[:top_k]
+
+        # Batch means: the size-weighted spread of the per-batch estimates around
+        # the pooled one gives the standard error of the pooled estimate.
+        batch_scores = self.get_batch_scores(top)
+        weights = np.array(self.batch_sizes)[:, None] / sum(self.batch_sizes)
+        deviations = weights * (batch_scores - self.scores[top]) ** 2
+        stderr = np.sqrt(deviations.sum(axis=0) / (len(self.batch_sizes) - 1))
+
+        quantile = student_t.ppf(0.5 + self.confidence / 2, len(self.batch_sizes) - 1)
+
+        return [
+            (
+                self.index.idx_to_node[int(i)],
+                float(self.scores[i]),
+                float(self.scores[i] - quantile * se),
+                float(self.scores[i] + quantile * se),
+            )
+            for i, se in zip(top, stderr)
+        ]
@@ -1,31 +1,329 @@
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple, Union
+
 import numpy as np
 from numpy import ndarray
+from scipy.linalg import solve_triangular
+from scipy.sparse import csc_array, csr_array, eye_array, issparse, tril, triu
+from scipy.sparse.linalg import splu
 
+from recommendation_engine.markov.kernel import KernelMatrix
 from recommendation_engine.markov.random_walk.base import RandomWalkBase
+from recommendation_engine.markov.random_walk.block_matvec import BlockMatvec
+from recommendation_engine.markov.random_walk.kernel_cache import KERNEL_CACHE
+from settings.constants import LinearSolverMethod, PowerIterationSolver
+
+GaussSeidelSplitting = Tuple[Callable[[ndarray], ndarray], KernelMatrix]
+
+
+@dataclass
+class SolverStats:
+    solver: Optional[Union[PowerIterationSolver, LinearSolverMethod]]
+    iterations: int = 0
+    residuals: List[float] = field(default_factory=list)
+    wall_time: float = 0.0
+    converged: bool = False
+    column_iterations: Optional[ndarray] = None
+    rank_stable: bool = False
+    iterations_saved: int = 0
+
+
+def build_gauss_seidel_splitting(P: KernelMatrix, alpha: float) -> GaussSeidelSplitting:
+    # (I - (1 - alpha) P^T) split into its lower triangle (with the diagonal)
+    # and its strictly upper triangle. A triangular matrix factorizes without
+    # fill-in, and SuperLU's solve is much cheaper per sweep than
+    # spsolve_triangular.
+    if issparse(P):
+        A = (1 - alpha) * csr_array(P.T)
+        lower = csc_array(eye_array(A.shape[0], dtype=A.dtype) - tril(A))
+        upper = triu(A, k=1, format="csr")
+        lu = splu(lower, permc_spec="NATURAL", diag_pivot_thresh=0)
+        return lu.solve, upper
+
+    A = (1 - alpha) * P.T
+    lower = np.eye(len(A), dtype=A.dtype) - np.tril(A)
+    upper = np.triu(A, k=1)
+
+    def solve(rhs: ndarray) -> ndarray:
+        return solve_triangular(lower, rhs, lower=True)
+
+    return solve, upper
 
 
 class PowerIterationRW(RandomWalkBase):
     def __init__(
         self,
-        P: ndarray,
+        P: KernelMatrix,
         pi0: ndarray,
         alpha: float = 0.15,
         tol: float = 1e-6,
         max_iter: int = 1000,
+        solver: PowerIterationSolver = PowerIterationSolver.JACOBI,
+        anderson_depth: int = 5,
+        extrapolation_period: int = 10,
+        x0: Optional[ndarray] = None,
+        top_k: Optional[int] = None,
+        candidates: Optional[ndarray] = None,
+        n_threads: int = 1,
     ):
         self.P = P
-        self.pi0 = pi0
+        self.pi0 = pi0.astype(P.dtype, copy=False)
         self.alpha = float(alpha)
-        self.tol = float(tol)
+        self.tol = max(float(tol), 10 * np.finfo(P.dtype).eps)
         self.max_iter = int(max_iter)
+        self.solver = PowerIterationSolver(solver)
+        self.anderson_depth = int(anderson_depth)
+        self.extrapolation_period = int(extrapolation_period)
+        self.x0 = self.get_start(x0)
+        self.top_k = top_k
+        self.candidates = candidates
+        self.n_threads = int(n_threads)
+        self.block_matvec = None
+        self.stats = None
+
+    def get_start(self, x0: Optional[ndarray]) -> ndarray:
+        # A previous solution is a valid starting point for any restart vector:
+        # the iteration is a contraction and stops on its own residual.
+        if x0 is None or x0.shape != self.pi0.shape:
+            return self.pi0
+
+        return x0.astype(self.pi0.dtype, copy=False)
+
+    def get_block_matvec(self) -> Optional[BlockMatvec]:
+        # Dense products already run on the BLAS threads
+        if self.n_threads <= 1 or not issparse(self.P):
+            return None
+
+        return KERNEL_CACHE.get(
+            self.P,
+            f"block_matvec:{self.n_threads}",
+            lambda: BlockMatvec(self.P, self.n_threads),
+        )
+
+    def propagate(self, pi: ndarray) -> ndarray:
+        if self.block_matvec is None:
+            return pi @ self.P
+
+        return self.block_matvec.apply_transposed(pi)
+
+    def step(self, pi: ndarray) -> ndarray:
+        return self.alpha * self.pi0 + (1 - self.alpha) * self.propagate(pi)
 
     def run(self) -> ndarray:
-        pi = self.pi0.copy()
+        pi, self.stats = self.run_with_stats()
+        return pi
+
+    def run_with_stats(self) -> Tuple[ndarray, SolverStats]:
+        solver = self.solver if self.pi0.ndim == 1 else PowerIterationSolver.JACOBI
+        stats = SolverStats(solver=solver)
+        start = time.perf_counter()
+        self.block_matvec = self.get_block_matvec()
+
+        if self.pi0.ndim == 2:
+            pi = self.run_batch(stats)
+        else:
+            pi = self.get_solver(solver)(stats)
+
+        stats.wall_time = time.perf_counter() - start
+        return pi, stats
+
+    def get_solver(
+        self, solver: PowerIterationSolver
+    ) -> Callable[[SolverStats], ndarray]:
+        solvers = {
+            PowerIterationSolver.JACOBI: self.run_jacobi,
+            PowerIterationSolver.GAUSS_SEIDEL: self.run_gauss_seidel,
+            PowerIterationSolver.ANDERSON: self.run_anderson,
+            PowerIterationSolver.QUADRATIC_EXTRAPOLATION: self.run_extrapolation,
+        }
+        return solvers[solver]
+
+    def is_rank_stable(self, pi: ndarray, residual: float) -> bool:
+        # pi = T(x) for the Jacobi map T, so ||pi - pi*||_1 <= (1 - alpha) / alpha
+        # * ||T(x) - x||_1. Two scores can then move towards each other by at
+        # most that bound in total, so gaps wider than it fix the top-k set and
+        # its order.
+        bound = (1 - self.alpha) / self.alpha * residual
+        scores = pi if self.candidates is None else pi[self.candidates]
+
+        k = min(self.top_k, len(scores))
+        m = min(k + 1, len(scores))
+        if m <= 1:
+            return True
+
+        top = np.argpartition(-scores, m - 1)[:m]
+        ordered = -np.sort(-scores[top])
+
+        return bool(np.all(ordered[:-1] - ordered[1:] > bound))
+
+    def estimate_remaining(self, residuals: List[float]) -> int:
+        # Iterations a full-tolerance run would still have needed, from the
+        # observed contraction rate (at most 1 - alpha for the Jacobi map).
+        rate = 1 - self.alpha
+        if len(residuals) > 1 and residuals[-2] > 0:
+            rate = min(residuals[-1] / residuals[-2], rate)
+
+        if residuals[-1] <= self.tol or rate <= 0:
+            return 0
+
+        return int(np.ceil(np.log(self.tol / residuals[-1]) / np.log(rate)))
+
+    def record(
+        self, stats: SolverStats, residual: float, pi: Optional[ndarray] = None
+    ) -> bool:
+        stats.iterations += 1
+        stats.residuals.append(float(residual))
+        stats.converged = residual < self.tol
+        if stats.converged:
+            return True
+
+        if self.top_k is None or pi is None or not self.is_rank_stable(pi, residual):
+            return False
+
+        stats.rank_stable = True
+        stats.iterations_saved = self.estimate_remaining(stats.residuals)
+        return True
+
+    def run_jacobi(self, stats: SolverStats) -> ndarray:
+        pi = self.x0.copy()
 
         for _ in range(self.max_iter):
-            pi_next = self.alpha * self.pi0 + (1 - self.alpha) * pi @ self.P
-            if np.linalg.norm(pi_next - pi, ord=1) < self.tol:
-                break
+            pi_next = self.step(pi)
+            if self.record(stats, np.abs(pi_next - pi).sum(), pi_next):
+                return pi_next
             pi = pi_next
 
         return pi
+
+    def run_gauss_seidel(self, stats: SolverStats) -> ndarray:
+        solve, upper = KERNEL_CACHE.get(
+            self.P,
+            f"gauss_seidel:{self.alpha}",
+            lambda: build_gauss_seidel_splitting(self.P, self.alpha),
+        )
+
+        b = self.alpha * self.pi0
+        pi = self.x0.copy()
+
+        for _ in range(self.max_iter):
+            pi_next = solve(b + upper @ pi).astype(self.pi0.dtype, copy=False)
+            if self.record(stats, np.abs(pi_next - pi).sum()):
+                return pi_next
+            pi = pi_next
+
+        return pi
+
+    def run_anderson(self, stats: SolverStats) -> ndarray:
+        # Anderson mixing over the last iterates, restarted whenever the
+        # residual grows so a bad extrapolation cannot stall convergence.
+        pi = self.x0.copy()
+        g_history, f_history = [], []
+        previous = np.inf
+
+        for _ in range(self.max_iter):
+            g = self.step(pi)
+            f = g - pi
+            residual = np.abs(f).sum()
+            if self.record(stats, residual, g):
+                return g
+
+            if residual > previous:
+                g_history, f_history = [], []
+            previous = residual
+
+            g_history.append(g)
+            f_history.append(f)
+            g_history = g_history[-(self.anderson_depth + 1) :]
+            f_history = f_history[-(self.anderson_depth + 1) :]
+
+            if len(f_history) < 2:
+                pi = g
+                continue
+
+            dF = np.diff(np.stack(f_history, axis=1), axis=1)
+            dG = np.diff(np.stack(g_history, axis=1), axis=1)
+            gamma = np.linalg.lstsq(dF, f, rcond=None)[0]
+            pi = (g - dG @ gamma).astype(self.pi0.dtype, copy=False)
+
+        return pi
+
+    def extrapolate(self, history: List[ndarray]) -> ndarray:
+        # Quadratic extrapolation (Kamvar et al.) from the last four iterates
+        x0, x1, x2, x3 = history
+        Y = np.stack([x1 - x0, x2 - x0], axis=1)
+        gamma_1, gamma_2 = np.linalg.lstsq(Y, -(x3 - x0), rcond=None)[0]
+        gamma_3 = 1.0
+
+        beta_0 = gamma_1 + gamma_2 + gamma_3
+        beta_1 = gamma_2 + gamma_3
+        beta_2 = gamma_3
+        pi = beta_0 * x1 + beta_1 * x2 + beta_2 * x3
+
+        # The fixed point carries the mass of pi0, which is below 1 when seeds
+        # repeat
+        pi *= self.pi0.sum() / pi.sum()
+        return pi.astype(self.pi0.dtype, copy=False)
+
+    def run_extrapolation(self, stats: SolverStats) -> ndarray:
+        pi = self.x0.copy()
+        history = [pi]
+
+        for it in range(1, self.max_iter + 1):
+            pi_next = self.step(pi)
+            residual = np.abs(pi_next - pi).sum()
+            if self.record(stats, residual, pi_next):
+                return pi_next
+
+            history = (history + [pi_next])[-4:]
+            pi = pi_next
+
+            if it % self.extrapolation_period == 0 and len(history) == 4:
+                candidate = self.extrapolate(history)
+                if np.abs(self.step(candidate) - candidate).sum() < residual:
+                    pi = candidate
+                    history = [pi]
+
+        return pi
+
+    def run_batch(self, stats: SolverStats) -> ndarray:
+        # Each row of pi0 is one seed set. They are iterated together as the
+        # columns of an (n x k) block, using one sparse matrix-matrix product per
+        # step, and each column is frozen once its own residual converges.
+        PT = None
+        if self.block_matvec is None:
+            PT = (1 - self.alpha) * (self.P.T.tocsr() if issparse(self.P) else self.P.T)
+
+        k = self.pi0.shape[0]
+
+        restart = csr_array(self.alpha * self.pi0).tocoo()
+        X = np.array(self.x0.T, order="C")
+        result = np.empty_like(X)
+        active = np.arange(k)
+        stats.column_iterations = np.zeros(k, dtype=np.int64)
+
+        for _ in range(self.max_iter):
+            if PT is None:
+                X_next = (1 - self.alpha) * self.block_matvec.apply_transposed(X)
+            else:
+                X_next = PT @ X
+            X_next[restart.col, restart.row] += restart.data
+
+            X -= X_next
+            residuals = np.abs(X, out=X).sum(axis=0)
+            X = X_next
+            stats.column_iterations[active] += 1
+            self.record(stats, residuals.max())
+
+            converged = residuals < self.tol
+            if np.any(converged):
+                result[:, active[converged]] = X[:, converged]
+                active = active[~converged]
+                X = np.ascontiguousarray(X[:, ~converged])
+                restart = restart.tocsr()[~converged].tocoo()
+
+            if len(active) == 0:
+                break
+
+        result[:, active] = X
+        return result.T
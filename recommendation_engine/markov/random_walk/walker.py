@@ -0,0 +1,72 @@
+import numpy as np
+from numpy import ndarray
+from numpy.random import Generator
+from scipy.sparse import csr_array, issparse
+
+from recommendation_engine.markov.kernel import KernelMatrix
+from recommendation_engine.markov.random_walk.kernel_cache import KERNEL_CACHE
+
+
+class WalkerEngine:
+    # Holds no random state, so one engine per kernel is shared by every walk
+    def __init__(self, P: KernelMatrix, buffer_size: int = 1 << 22):
+        P = P if issparse(P) else csr_array(P)
+        self.n = P.shape[0]
+        self.indptr = P.indptr.astype(np.int64)
+        self.indices = P.indices.astype(np.int64)
+        self.buffer_size = int(buffer_size)
+
+        data = P.data.astype(np.float64)
+        arc_rows = np.repeat(np.arange(self.n), np.diff(self.indptr))
+        row_sums = np.bincount(arc_rows, weights=data, minlength=self.n)
+
+        # One sorted table for all rows: arc j of row i has key i + F_i(j), where
+        # F_i is the row's normalized cumulative distribution. Sampling row i is a
+        # single searchsorted of i + u, for any number of walkers at once.
+        cumulative = np.cumsum(data)
+        row_offsets = np.concatenate([[0.0], cumulative])[self.indptr[:-1]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            local = (cumulative - row_offsets[arc_rows]) / row_sums[arc_rows]
+        self.keys = arc_rows + np.clip(np.nan_to_num(local), 0.0, 1.0)
+        self.dangling = row_sums == 0
+
+    @staticmethod
+    def for_kernel(P: KernelMatrix) -> "WalkerEngine":
+        return KERNEL_CACHE.get(P, "walker_engine", lambda: WalkerEngine(P))
+
+    def step(self, current: ndarray, rng: Generator) -> ndarray:
+        targets = current + rng.random(len(current))
+        positions = np.searchsorted(self.keys, targets, side="right")
+        positions = np.minimum(positions, self.indptr[current + 1] - 1)
+
+        return np.where(self.dangling[current], current, self.indices[positions])
+
+    def count_visits(self, starts: ndarray, steps: int, rng: Generator) -> ndarray:
+        counts = np.zeros(self.n, dtype=np.int64)
+        chunk = max(1, self.buffer_size // max(1, len(starts)))
+        visits = [starts]
+
+        current = starts
+        for step in range(1, int(steps) + 1):
+            current = self.step(current, rng)
+            visits.append(current)
+
+            if step % chunk == 0:
+                counts += np.bincount(np.concatenate(visits), minlength=self.n)
+                visits = []
+
+        if visits:
+            counts += np.bincount(np.concatenate(visits), minlength=self.n)
+
+        return counts
+
+    def sample_path(self, start: int, steps: int, rng: Generator) -> ndarray:
+        path = np.empty(int(steps) + 1, dtype=np.int64)
+        path[0] = start
+
+        current = np.array([start], dtype=np.int64)
+        for step in range(1, int(steps) + 1):
+            current = self.step(current, rng)
+            path[step] = current[0]
+
+        return path
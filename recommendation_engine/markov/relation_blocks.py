@@ -0,0 +1,126 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+from numpy import dtype, ndarray
+from scipy.sparse import csr_array
+
+from settings.constants import NodeType
+from settings.mapping import AUTHORIZED_RELATIONS, NODE_TYPE_CODES
+
+
+def type_transition_array(T: Dict[str, Dict[str, float]]) -> ndarray:
+    array = np.zeros((len(NODE_TYPE_CODES), len(NODE_TYPE_CODES)))
+
+    for src_type, targets in T.items():
+        for dst_type, p in targets.items():
+            array[NODE_TYPE_CODES[src_type], NODE_TYPE_CODES[dst_type]] = p
+
+    return array
+
+
+def get_block_pairs() -> List[Tuple[NodeType, NodeType]]:
+    pairs = []
+
+    for u, v in AUTHORIZED_RELATIONS:
+        for pair in ((u, v), (v, u)):
+            if pair not in pairs:
+                pairs.append(pair)
+
+    return pairs
+
+
+class RelationBlocks:
+    def __init__(
+        self,
+        src: ndarray,
+        dst: ndarray,
+        src_type: ndarray,
+        dst_type: ndarray,
+        n: int,
+    ):
+        self.n = n
+        self.n_types = len(NODE_TYPE_CODES)
+        self.pairs = get_block_pairs()
+        self.validate_relations(src_type, dst_type)
+
+        self.node_types = np.zeros(n, dtype=np.int8)
+        self.node_types[src] = src_type
+
+        # Number of neighbours of each type, per source node
+        self.type_counts = np.bincount(
+            src * self.n_types + dst_type, minlength=n * self.n_types
+        ).reshape(n, self.n_types)
+
+        # Every (source type, target type) block is row-normalized on its own, so a
+        # strategy only rescales each block by its per-row type weight.
+        values = 1.0 / self.type_counts[src, dst_type]
+
+        # Reserve an explicit zero on the diagonal of every node without a
+        # self-loop, so the self-loop fallback never changes the sparsity pattern.
+        missing = np.setdiff1d(np.arange(n), src[src == dst])
+        src = np.concatenate([src, missing])
+        dst = np.concatenate([dst, missing])
+        dst_type = np.concatenate([dst_type, self.node_types[missing]])
+        values = np.concatenate([values, np.zeros(len(missing))])
+
+        order = np.lexsort((dst, src))
+        src, dst, dst_type = src[order], dst[order], dst_type[order]
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        self.adjacency = csr_array((values[order], dst, indptr), shape=(n, n))
+        self.arc_types = dst_type.astype(np.int8)
+        self.diagonal = np.flatnonzero(src == dst)
+
+    def validate_relations(self, src_type: ndarray, dst_type: ndarray) -> None:
+        allowed = [
+            NODE_TYPE_CODES[u.value] * self.n_types + NODE_TYPE_CODES[v.value]
+            for u, v in self.pairs
+        ]
+        pair_codes = src_type.astype(np.int64) * self.n_types + dst_type
+        forbidden = ~np.isin(pair_codes, allowed)
+
+        if np.any(forbidden):
+            codes = {code: t for t, code in NODE_TYPE_CODES.items()}
+            i = int(np.argmax(forbidden))
+            raise ValueError(
+                f"Forbidden relation between {codes[int(src_type[i])]} "
+                f"and {codes[int(dst_type[i])]}"
+            )
+
+    def get_block(self, src_type: NodeType, dst_type: NodeType) -> csr_array:
+        if (src_type, dst_type) not in self.pairs:
+            raise ValueError(f"No relation block between {src_type} and {dst_type}")
+
+        rows = np.flatnonzero(self.node_types == NODE_TYPE_CODES[src_type.value])
+        cols = np.flatnonzero(self.node_types == NODE_TYPE_CODES[dst_type.value])
+
+        block = self.adjacency[rows][:, cols]
+        block.eliminate_zeros()
+        return block
+
+    def get_type_weights(self, T: ndarray) -> Tuple[ndarray, ndarray]:
+        type_weights = np.where(self.type_counts > 0, T[self.node_types], 0.0)
+        totals = type_weights.sum(axis=1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weights = np.where(totals[:, None] > 0, type_weights / totals[:, None], 0)
+
+        return weights, totals
+
+    def compose(self, T: ndarray, dtype: dtype = np.float64) -> csr_array:
+        weights, totals = self.get_type_weights(T)
+
+        arc_rows = np.repeat(np.arange(self.n), np.diff(self.adjacency.indptr))
+        data = self.adjacency.data * weights[arc_rows, self.arc_types]
+        data[self.diagonal[totals == 0]] = 1.0
+        data = data.astype(dtype, copy=False)
+
+        # The composed kernel shares indices and indptr with the blocks, so a new
+        # strategy only costs one data array. Arcs whose type has zero weight are
+        # kept as explicit zeros.
+        return csr_array(
+            (data, self.adjacency.indices, self.adjacency.indptr),
+            shape=(self.n, self.n),
+            copy=False,
+        )
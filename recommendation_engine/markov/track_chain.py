@@ -0,0 +1,139 @@
+import logging
+from typing import Tuple
+
+import numpy as np
+from numpy import ndarray
+from scipy.sparse import csr_array, issparse
+
+from recommendation_engine.markov.kernel import KernelMatrix
+
+logger = logging.getLogger(__name__)
+
+
+def prune(A: csr_array, threshold: float) -> csr_array:
+    A = A.copy()
+    A.data[A.data < threshold] = 0
+    A.eliminate_zeros()
+    return A
+
+
+class TrackChain:
+    # Track-only operator S of a kernel: for restart vectors supported on the
+    # tracks, PPR restricted to the tracks solves pi_T = alpha pi0_T
+    # + (1 - alpha) pi_T S exactly. S is substochastic (mass that would have
+    # teleported from an album, artist or tag is not part of it).
+    def __init__(
+        self,
+        tracks: ndarray,
+        S: csr_array,
+        alpha: float,
+        horizon: int,
+        error_bound: float,
+    ):
+        self.tracks = tracks
+        self.S = S
+        self.alpha = alpha
+        self.horizon = horizon
+        self.error_bound = error_bound
+
+    def get_score_tolerance(self) -> float:
+        # ||S - S_exact||_inf <= error_bound and the track scores have mass at
+        # most 1, so their L1 error is at most (1 - alpha) / alpha * error_bound.
+        return (1 - self.alpha) / self.alpha * self.error_bound
+
+    def restrict(self, pi: ndarray) -> ndarray:
+        return pi[..., self.tracks]
+
+    def expand(self, scores: ndarray, n: int) -> ndarray:
+        pi = np.zeros(scores.shape[:-1] + (n,), dtype=scores.dtype)
+        pi[..., self.tracks] = scores
+        return pi
+
+
+class TrackChainBuilder:
+    # Eliminates the non-track nodes O from the PPR system:
+    #   S = P_TT + (1 - alpha) P_TO (I - (1 - alpha) P_OO)^-1 P_OT
+    # with the inverse expanded as a Neumann series, truncated once the
+    # remaining terms weigh less than tol, and every term pruned below
+    # threshold.
+    def __init__(
+        self,
+        P: KernelMatrix,
+        tracks: ndarray,
+        alpha: float = 0.15,
+        threshold: float = 1e-8,
+        tol: float = 1e-6,
+        max_horizon: int = 100,
+    ):
+        self.P = csr_array(P) if not issparse(P) else P.tocsr()
+        self.tracks = np.sort(np.asarray(tracks, dtype=np.int64))
+        self.alpha = float(alpha)
+        self.threshold = float(threshold)
+        self.tol = float(tol)
+        self.max_horizon = int(max_horizon)
+
+    def get_blocks(self) -> Tuple[csr_array, csr_array, csr_array, csr_array]:
+        others = np.setdiff1d(np.arange(self.P.shape[0]), self.tracks)
+
+        rows_T, rows_O = self.P[self.tracks], self.P[others]
+        return (
+            rows_T[:, self.tracks],
+            rows_T[:, others],
+            rows_O[:, self.tracks],
+            rows_O[:, others],
+        )
+
+    def get_exact_row_sums(
+        self, P_TT: csr_array, P_TO: csr_array, P_OT: csr_array, P_OO: csr_array
+    ) -> ndarray:
+        # S 1 only needs (I - (1 - alpha) P_OO)^-1 applied to a single vector
+        c = 1 - self.alpha
+        v = np.asarray(P_OT.sum(axis=1)).ravel()
+        y = v.copy()
+
+        for _ in range(self.max_horizon * 10):
+            y_next = v + c * (P_OO @ y)
+            if np.abs(y_next - y).max(initial=0.0) < 1e-12:
+                y = y_next
+                break
+            y = y_next
+
+        return np.asarray(P_TT.sum(axis=1)).ravel() + c * (P_TO @ y)
+
+    def build(self) -> TrackChain:
+        P_TT, P_TO, P_OT, P_OO = self.get_blocks()
+        c = 1 - self.alpha
+
+        series = term = prune(P_OT, self.threshold)
+        horizon = 0
+
+        # The terms left out weigh at most (1 - alpha) / alpha times the last one
+        while horizon < self.max_horizon:
+            if c / self.alpha * term.sum(axis=1).max(initial=0.0) < self.tol:
+                break
+
+            term = prune(c * (P_OO @ term), self.threshold)
+            series = series + term
+            horizon += 1
+
+        S = prune(csr_array(P_TT + c * (P_TO @ series)), self.threshold)
+
+        # Truncation and pruning only ever drop nonnegative entries, so the
+        # row sums measure ||S - S_exact||_inf exactly.
+        exact = self.get_exact_row_sums(P_TT, P_TO, P_OT, P_OO)
+        row_errors = exact - np.asarray(S.sum(axis=1)).ravel()
+
+        chain = TrackChain(
+            tracks=self.tracks,
+            S=S.astype(self.P.dtype),
+            alpha=self.alpha,
+            horizon=horizon,
+            error_bound=float(np.maximum(row_errors, 0).max(initial=0.0)),
+        )
+        logger.info(
+            f"Track chain: {len(self.tracks)} of {self.P.shape[0]} nodes, "
+            f"{S.nnz} entries (kernel: {self.P.nnz}), horizon {horizon}, "
+            f"score tolerance {chain.get_score_tolerance():.2e}"
+        )
+
+        return chain
@@ -1,3 +1,19 @@
+from recommendation_engine.services.async_recommender import (  # noqa: F401, E402
+    AsyncRecommender,
+)
+from recommendation_engine.services.latency import (  # noqa: F401, E402
+    LatencyHistogram,
+    LatencyRecorder,
+)
 from recommendation_engine.services.markov_recommender import (  # noqa: F401, E402
     MarkovRecommender,
 )
+from recommendation_engine.services.recommender_service import (  # noqa: F401, E402
+    RecommenderService,
+    RecommenderSnapshot,
+)
+from recommendation_engine.services.result_cache import (  # noqa: F401, E402
+    MemoryBackend,
+    RedisBackend,
+    ResultCache,
+)
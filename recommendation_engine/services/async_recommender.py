@@ -0,0 +1,215 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from recommendation_engine.markov.kernel import KernelMatrix
+from recommendation_engine.services.markov_recommender import MarkovRecommender
+from recommendation_engine.services.recommender_service import RecommenderService
+from recommendation_engine.services.result_cache import freeze_scores
+from settings.config_loader import load_micro_batching_parameters
+from settings.constants import MarkovStrategy, RandomWalkStrategy
+
+logger = logging.getLogger(__name__)
+
+BATCHED_STRATEGIES = (
+    RandomWalkStrategy.POWER_ITERATION,
+    RandomWalkStrategy.LINEAR_SOLVER,
+    RandomWalkStrategy.LOW_RANK,
+)
+
+RequestKey = Tuple[Tuple[str, ...], int]
+Request = Tuple[RequestKey, List[str], "asyncio.Future[List[int]]"]
+Result = Union[List[int], Exception]
+
+
+class AsyncRecommender:
+    # asyncio front end: requests arriving within max_wait_ms of the first
+    # pending one (or until max_batch_size) are solved together as one batched
+    # PPR, and a request identical to one already in flight awaits that one.
+    # Batches read and fill the recommender's result cache like compute_scores;
+    # with the PPR cache or the track chain enabled, sets are solved one by one
+    # through compute_scores so that results match recommend().
+    def __init__(
+        self,
+        recommender: Union[MarkovRecommender, RecommenderService],
+        markov_strategy: Optional[MarkovStrategy] = None,
+        max_wait_ms: Optional[float] = None,
+        max_batch_size: Optional[int] = None,
+        workers: int = 1,
+    ):
+        params = load_micro_batching_parameters()
+
+        self.recommender = recommender
+        self.markov_strategy = markov_strategy
+        self.max_wait = (
+            max_wait_ms if max_wait_ms is not None else params["max_wait_ms"]
+        ) / 1000
+        self.max_batch_size = int(max_batch_size or params["max_batch_size"])
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="micro_batch"
+        )
+
+        self.pending: List[Request] = []
+        self.in_flight: Dict[RequestKey, "asyncio.Future[List[int]]"] = {}
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+
+    def get_recommender(self) -> MarkovRecommender:
+        # One snapshot per batch when serving from a RecommenderService
+        if isinstance(self.recommender, RecommenderService):
+            return self.recommender.snapshot.recommender
+
+        return self.recommender
+
+    async def recommend(self, seed_nodes: List[str], top_k: int = 10) -> List[int]:
+        loop = asyncio.get_running_loop()
+        key = (tuple(sorted(seed_nodes)), int(top_k))
+
+        future = self.in_flight.get(key)
+        if future is None:
+            future = loop.create_future()
+            self.in_flight[key] = future
+            self.pending.append((key, list(seed_nodes), future))
+
+            if len(self.pending) >= self.max_batch_size:
+                self.flush()
+            elif self.flush_handle is None:
+                self.flush_handle = loop.call_later(self.max_wait, self.flush)
+
+        # Shielded, so a cancelled caller does not cancel the shared request
+        return list(await asyncio.shield(future))
+
+    def flush(self) -> None:
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.ensure_future(self.run_batch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run_batch(self, batch: List[Request]) -> None:
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+
+        try:
+            results = await loop.run_in_executor(self.executor, self.solve, batch)
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} recommendations failed: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            for key, _, _ in batch:
+                self.in_flight.pop(key, None)
+
+    def can_batch(self, recommender: MarkovRecommender) -> bool:
+        # The PPR cache and the track chain have their own per-set solves,
+        # which batching the full chain would bypass
+        return (
+            recommender.walk_strategy in BATCHED_STRATEGIES
+            and not recommender.can_use_ppr_cache()
+            and not (recommender.use_track_chain and recommender.has_exact_walk())
+        )
+
+    def solve_batch(
+        self,
+        recommender: MarkovRecommender,
+        seed_sets: Dict[Tuple[str, ...], List[str]],
+        strategy: MarkovStrategy,
+    ) -> Dict[Tuple[str, ...], KernelMatrix]:
+        # Batched solve of the sets missing from the result cache, stored
+        # under the same keys as compute_scores
+        cache = recommender.result_cache
+        keys = {
+            seeds: recommender.build_cache_key(
+                "scores", seed_nodes, strategy, top_k=None
+            )
+            for seeds, seed_nodes in seed_sets.items()
+        }
+
+        results, missing = {}, {}
+        for seeds, seed_nodes in seed_sets.items():
+            cached = None if cache is None else cache.get(keys[seeds])
+            if cached is None:
+                missing[seeds] = seed_nodes
+            else:
+                results[seeds] = cached[1]
+
+        if missing:
+            scores = recommender.compute_scores_batch(list(missing.values()), strategy)
+            for (seeds, seed_nodes), row in zip(missing.items(), scores):
+                if cache is None:
+                    results[seeds] = freeze_scores(row)
+                else:
+                    # Copied, so an entry does not keep the whole batch alive
+                    results[seeds] = freeze_scores(row.copy())
+                    cache.set(keys[seeds], (seed_nodes, results[seeds]))
+
+        return results
+
+    def solve_seed_sets(
+        self,
+        recommender: MarkovRecommender,
+        seed_sets: Dict[Tuple[str, ...], List[str]],
+    ) -> Dict[Tuple[str, ...], Union[KernelMatrix, Exception]]:
+        strategy = self.markov_strategy or recommender.markov_strategy
+
+        if self.can_batch(recommender):
+            try:
+                return self.solve_batch(recommender, seed_sets, strategy)
+            except ValueError:
+                # A single invalid seed set fails the whole batch, so the sets
+                # are retried one by one and only the invalid one fails.
+                pass
+
+        results = {}
+        for seeds, seed_nodes in seed_sets.items():
+            try:
+                results[seeds] = recommender.compute_scores(
+                    strategy, seed_nodes=seed_nodes
+                )[1]
+            except ValueError as e:
+                results[seeds] = e
+
+        return results
+
+    def solve(self, batch: List[Request]) -> List[Result]:
+        recommender = self.get_recommender()
+
+        # Requests differing only by top_k share one solve
+        seed_sets: Dict[Tuple[str, ...], List[str]] = {}
+        for (seeds, _), seed_nodes, _ in batch:
+            seed_sets.setdefault(seeds, seed_nodes)
+
+        with recommender.latency.request(
+            "micro_batch", batch_size=len(batch), seed_sets=len(seed_sets)
+        ):
+            scores = self.solve_seed_sets(recommender, seed_sets)
+
+            results: List[Result] = []
+            for (seeds, top_k), seed_nodes, _ in batch:
+                if isinstance(scores[seeds], Exception):
+                    results.append(scores[seeds])
+                else:
+                    results.append(
+                        recommender.rank_scores(seed_nodes, scores[seeds], top_k)
+                    )
+
+        return results
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,119 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+from settings.config_loader import load_latency_parameters
+
+logger = logging.getLogger(__name__)
+
+# Stage timings of the request running in the current thread or task
+_TRACE: ContextVar[Optional[Dict[str, Any]]] = ContextVar("latency_trace", default=None)
+
+
+class LatencyHistogram:
+    # Percentiles over a rolling window of the last max_samples observations,
+    # so a long-running process reports its recent behaviour
+    def __init__(self, max_samples: int = 10000):
+        self.samples: deque = deque(maxlen=int(max_samples))
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.samples.append(float(value))
+        self.count += 1
+
+    def get_summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {"count": self.count}
+
+        values = np.fromiter(self.samples, dtype=np.float64)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {
+            "count": self.count,
+            "mean": float(values.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(values.max()),
+        }
+
+
+class LatencyRecorder:
+    # Histograms of per-stage timings (names ending in _ms) and solver work
+    # counts, shared by every request of a recommender. Stages timed inside a
+    # request are also collected into its trace, which can be logged as one
+    # JSON line when the request ends.
+    def __init__(self, max_samples: int = 10000, log_requests: bool = False):
+        self.max_samples = int(max_samples)
+        self.log_requests = bool(log_requests)
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def from_config() -> "LatencyRecorder":
+        return LatencyRecorder(**load_latency_parameters())
+
+    def observe(self, name: str, value: float) -> None:
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = LatencyHistogram(self.max_samples)
+            self.histograms[name].observe(value)
+
+        trace = _TRACE.get()
+        if trace is not None:
+            trace[name] = trace.get(name, 0) + value
+
+    def annotate(self, **fields: Any) -> None:
+        trace = _TRACE.get()
+        if trace is not None:
+            trace.update(fields)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(f"{name}_ms", (time.perf_counter() - start) * 1000)
+
+    @contextmanager
+    def request(self, name: str, **fields: Any) -> Iterator[None]:
+        # Nested requests (recommend calling compute_scores) belong to the
+        # outer one
+        if _TRACE.get() is not None:
+            yield
+            return
+
+        trace: Dict[str, Any] = {"request": name, **fields}
+        token = _TRACE.set(trace)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            trace["error"] = type(e).__name__
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            _TRACE.reset(token)
+            self.observe(f"{name}_ms", elapsed)
+            trace[f"{name}_ms"] = elapsed
+
+            if self.log_requests:
+                logger.info(json.dumps(trace, sort_keys=True, default=str))
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            return {
+                name: histogram.get_summary()
+                for name, histogram in sorted(self.histograms.items())
+            }
+
+    def reset(self) -> None:
+        with self.lock:
+            self.histograms.clear()
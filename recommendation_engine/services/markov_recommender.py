@@ -1,11 +1,46 @@
-from typing import List, Tuple
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+from scipy.sparse import coo_array, issparse
 
 from database.db_env import DBEnv
 from database.session import get_session
 from helpers import DBHelpers
 from recommendation_engine.graph import GraphAssembler
-from recommendation_engine.markov import MarkovKernel, RandomWalkFactory
-from settings.constants import MarkovStrategy, NodeType, RandomWalkStrategy
+from recommendation_engine.markov import (
+    InitialDistributionBuilder,
+    ItemTable,
+    ItemTableBuilder,
+    KernelStore,
+    MarkovKernel,
+    PPRCache,
+    RandomWalkBase,
+    RandomWalkFactory,
+    TrackChain,
+    TrackChainBuilder,
+)
+from recommendation_engine.markov.kernel import KernelMatrix
+from recommendation_engine.markov.random_walk.factory import RW_CONFIG
+from recommendation_engine.markov.random_walk.power_iteration import SolverStats
+from recommendation_engine.services.latency import LatencyRecorder
+from recommendation_engine.services.result_cache import ResultCache, freeze_scores
+from settings.config_loader import (
+    load_item_table_parameters,
+    load_ppr_cache_parameters,
+    load_random_walk_parameters,
+    load_random_walk_precision,
+    load_track_chain_parameters,
+)
+from settings.constants import (
+    MarkovStrategy,
+    NodeType,
+    Precision,
+    RandomWalkStrategy,
+)
+from settings.mapping import NODE_TYPE_CODES
 
 
 class MarkovRecommender:
@@ -15,19 +50,187 @@ class MarkovRecommender:
         walk_strategy: RandomWalkStrategy = RandomWalkStrategy.POWER_ITERATION,
         n_last_listenings: int = 3,
         env: DBEnv = DBEnv.EXP,
+        sparse: bool = True,
+        use_kernel_store: bool = True,
+        precision: Optional[Precision] = None,
+        warm_start: bool = True,
+        use_ppr_cache: bool = False,
+        use_track_chain: bool = False,
+        result_cache: Optional[ResultCache] = None,
+        latency: Optional[LatencyRecorder] = None,
     ):
         self.env = env
         self.markov_strategy = markov_strategy
         self.walk_strategy = walk_strategy
         self.n_last_listenings = n_last_listenings
+        self.sparse = sparse
+        self.precision = precision or load_random_walk_precision()
+        self.kernel_store = KernelStore() if use_kernel_store else None
+        self.warm_start = warm_start
+        self.use_ppr_cache = use_ppr_cache
+        self.use_track_chain = use_track_chain
+        self.result_cache = result_cache
+        self.latency = latency or LatencyRecorder.from_config()
+        self.local = threading.local()
 
-        self.graph_assembler = GraphAssembler(self.env)
-        self.graph_assembler.assemble_graph()
+        self.graph_assembler = self.assemble_graph()
         self.G = self.graph_assembler.G
+        self.load_kernel()
+
+    @property
+    def last_stats(self) -> Optional[SolverStats]:
+        # Stats of the last solve made by the calling thread, so concurrent
+        # requests on a shared recommender each see their own
+        return getattr(self.local, "stats", None)
+
+    @last_stats.setter
+    def last_stats(self, stats: Optional[SolverStats]) -> None:
+        self.local.stats = stats
+
+    def assemble_graph(self) -> GraphAssembler:
+        graph_assembler = GraphAssembler(self.env)
+        graph_assembler.assemble_graph()
+        return graph_assembler
+
+    def load_kernel(self) -> None:
+        self.kernel = MarkovKernel(
+            self.G,
+            self.markov_strategy,
+            sparse=self.sparse,
+            dtype=self.precision.value,
+        )
+        if self.kernel_store is not None:
+            self.kernel_store.load_or_build(self.kernel)
+        else:
+            self.kernel.build_kernel()
+
+        self.reset_kernels()
 
-        self.kernel = MarkovKernel(self.G, self.markov_strategy)
-        self.P = self.kernel.build_kernel()
+    def reset_kernels(self) -> None:
+        self.P = self.kernel.P
         self.index = self.kernel.index
+        self.kernels = {self.markov_strategy: self.P}
+        self.warm_starts: Dict[MarkovStrategy, ndarray] = {}
+        self.ppr_caches: Dict[MarkovStrategy, PPRCache] = {}
+        self.item_tables: Dict[MarkovStrategy, ItemTable] = {}
+        self.track_chains: Dict[MarkovStrategy, TrackChain] = {}
+        self.graph_version: Optional[str] = None
+        self.build_track_lookup()
+
+    def build_track_lookup(self) -> None:
+        self.track_mask = (
+            self.kernel.node_types == NODE_TYPE_CODES[NodeType.TRACK.value]
+        )
+        self.track_ids = np.full(self.index.n, -1, dtype=np.int64)
+        self.track_ids[self.track_mask] = [
+            self.get_track_id_from_node(self.index.nodes[i])
+            for i in np.flatnonzero(self.track_mask)
+        ]
+
+    def get_graph_version(self) -> str:
+        # Content hash of the graph, so replicas and rebuilt snapshots of the
+        # same graph share cache entries
+        if self.graph_version is None:
+            self.graph_version = KernelStore.fingerprint_graph(self.G)
+
+        return self.graph_version
+
+    def build_cache_key(
+        self,
+        kind: str,
+        seed_nodes: List[str],
+        strategy: MarkovStrategy,
+        **params: Any,
+    ) -> str:
+        return ResultCache.build_key(
+            kind,
+            seed_nodes,
+            markov_strategy=strategy,
+            walk_strategy=self.walk_strategy,
+            solver_params=RW_CONFIG.get(self.walk_strategy, {}),
+            precision=self.precision,
+            use_ppr_cache=self.use_ppr_cache,
+            use_track_chain=self.use_track_chain,
+            graph_version=self.get_graph_version(),
+            **params,
+        )
+
+    def get_warm_start(self, strategy: MarkovStrategy) -> Optional[ndarray]:
+        if not self.warm_start:
+            return None
+
+        return self.warm_starts.get(strategy)
+
+    def update_warm_start(
+        self, strategy: MarkovStrategy, rw: RandomWalkBase, scores: KernelMatrix
+    ) -> None:
+        # Only converged vectors from the current kernel are reused
+        if rw.stats is None or not rw.stats.converged:
+            return
+
+        if isinstance(scores, ndarray) and scores.shape == (self.index.n,):
+            self.warm_starts[strategy] = scores
+
+    def get_kernel(
+        self, markov_strategy: Optional[MarkovStrategy] = None
+    ) -> KernelMatrix:
+        strategy = markov_strategy or self.markov_strategy
+
+        if strategy not in self.kernels:
+            self.kernels[strategy] = self.kernel.compose_kernel(strategy)
+
+        return self.kernels[strategy]
+
+    def warm_up(self, markov_strategy: Optional[MarkovStrategy] = None) -> None:
+        # Builds the per-kernel solver state that requests would otherwise build
+        # lazily, so that serving never pays for it and concurrent requests
+        # only read it
+        strategy = markov_strategy or self.markov_strategy
+        P = self.get_kernel(strategy)
+
+        if self.walk_strategy == RandomWalkStrategy.LOW_RANK:
+            pi0 = np.zeros(self.index.n, dtype=P.dtype)
+            RandomWalkFactory.create_low_rank(P, pi0).prepare()
+
+        if self.result_cache is not None:
+            self.get_graph_version()
+
+        if self.can_use_ppr_cache():
+            self.get_ppr_cache(strategy)
+
+        if self.use_track_chain and self.has_exact_walk():
+            self.get_track_chain(strategy)
+
+    def refresh(self) -> None:
+        graph_assembler = self.assemble_graph()
+        G_new = graph_assembler.G
+
+        added_nodes = [node for node in G_new.nodes if node not in self.G]
+        added_edges = [(u, v) for u, v in G_new.edges if not self.G.has_edge(u, v)]
+
+        n_nodes = self.G.number_of_nodes() + len(added_nodes)
+        n_edges = self.G.number_of_edges() + len(added_edges)
+        has_removals = (
+            G_new.number_of_nodes() != n_nodes or G_new.number_of_edges() != n_edges
+        )
+
+        if has_removals:
+            self.graph_assembler = graph_assembler
+            self.G = G_new
+            self.load_kernel()
+            return
+
+        for node in added_nodes:
+            self.G.add_node(node, **G_new.nodes[node])
+
+        for u, v in added_edges:
+            self.G.add_edge(u, v, **G_new.edges[u, v])
+
+        # Incremental updates are not persisted: dumping the whole kernel would
+        # cost far more than the few rows it touched. The next full load
+        # snapshots the current graph.
+        self.kernel.update_kernel(added_nodes, added_edges)
+        self.reset_kernels()
 
     def get_seed_nodes(self) -> List[str]:
         with get_session(self.env) as session:
@@ -43,42 +246,338 @@ class MarkovRecommender:
 
         return [seed.name for seed in seed_nodes]
 
-    def compute_scores(self) -> Tuple[List[str], List[Tuple[str, float]]]:
-        seed_nodes = self.get_seed_nodes()
+    def fetch_seed_nodes(self) -> List[str]:
+        with self.latency.stage("seed_fetch"):
+            seed_nodes = self.get_seed_nodes()
 
-        rw = RandomWalkFactory.create(
-            self.walk_strategy,
-            self.P,
-            self.index,
-            seed_nodes,
+        self.latency.annotate(seeds=len(seed_nodes))
+        return seed_nodes
+
+    def run_walk(self, rw: RandomWalkBase) -> KernelMatrix:
+        with self.latency.stage("walk_run"):
+            scores = rw.run()
+
+        self.last_stats = rw.stats
+        iterations = rw.get_iterations()
+        if iterations is not None:
+            self.latency.observe("walk_iterations", iterations)
+
+        if rw.stats is not None and rw.stats.rank_stable:
+            self.latency.annotate(iterations_saved=rw.stats.iterations_saved)
+
+        return scores
+
+    def get_track_indices(self) -> ndarray:
+        return np.flatnonzero(self.track_mask)
+
+    def get_candidate_indices(self, seed_nodes: List[str]) -> ndarray:
+        candidates = self.track_mask.copy()
+
+        seeds = [
+            self.index.node_to_idx[n] for n in seed_nodes if n in self.index.node_to_idx
+        ]
+        candidates[seeds] = False
+
+        return np.flatnonzero(candidates)
+
+    def get_ppr_cache(self, strategy: MarkovStrategy) -> PPRCache:
+        if strategy not in self.ppr_caches:
+            self.ppr_caches[strategy] = PPRCache(**load_ppr_cache_parameters())
+
+        return self.ppr_caches[strategy]
+
+    def has_exact_walk(self) -> bool:
+        return self.walk_strategy in (
+            RandomWalkStrategy.POWER_ITERATION,
+            RandomWalkStrategy.LINEAR_SOLVER,
         )
 
-        scores = rw.run()
+    def can_use_ppr_cache(self) -> bool:
+        # Only exact solvers give single-seed vectors that can be mixed linearly
+        return self.use_ppr_cache and self.has_exact_walk()
+
+    def get_track_chain(self, strategy: MarkovStrategy) -> TrackChain:
+        if strategy not in self.track_chains:
+            alpha = load_random_walk_parameters()[self.walk_strategy]["alpha"]
+            self.track_chains[strategy] = TrackChainBuilder(
+                self.get_kernel(strategy),
+                self.get_track_indices(),
+                alpha=alpha,
+                **load_track_chain_parameters(),
+            ).build()
+
+        return self.track_chains[strategy]
+
+    def compute_chain_scores(
+        self, seed_nodes: List[str], strategy: MarkovStrategy, top_k: Optional[int]
+    ) -> ndarray:
+        # Iterates on the track-only chain and scatters the track scores back
+        # to the full index, so ranking is unchanged.
+        chain = self.get_track_chain(strategy)
+        pi0 = InitialDistributionBuilder(
+            seed_nodes, self.index, dtype=chain.S.dtype
+        ).build()
+
+        warm_start = self.get_warm_start(strategy)
+        candidates = None
+        if top_k:
+            candidates = np.searchsorted(
+                chain.tracks, self.get_candidate_indices(seed_nodes)
+            )
+
+        with self.latency.stage("walk_create"):
+            rw = RandomWalkFactory.create_exact(
+                self.walk_strategy,
+                chain.S,
+                chain.restrict(pi0),
+                x0=None if warm_start is None else chain.restrict(warm_start),
+                top_k=top_k,
+                candidates=candidates,
+            )
+
+        scores = chain.expand(self.run_walk(rw), self.index.n)
+        self.update_warm_start(strategy, rw, scores)
+        return scores
+
+    def compute_cached_scores(
+        self, seed_nodes: List[str], strategy: MarkovStrategy
+    ) -> coo_array:
+        nodes, weights = InitialDistributionBuilder(
+            seed_nodes, self.index
+        ).get_seed_weights()
+
+        cache = self.get_ppr_cache(strategy)
+        vectors, missing = cache.get_many(nodes)
+        self.last_stats = None
+
+        if missing:
+            with self.latency.stage("walk_create"):
+                rw = RandomWalkFactory.create_batch(
+                    self.walk_strategy,
+                    self.get_kernel(strategy),
+                    self.index,
+                    [[self.index.idx_to_node[node]] for node in missing],
+                )
+            for node, scores in zip(missing, self.run_walk(rw)):
+                vectors[node] = cache.put(node, scores)
+
+        indices = np.concatenate([vectors[int(node)][0] for node in nodes])
+        values = np.concatenate(
+            [weight * vectors[int(node)][1] for node, weight in zip(nodes, weights)]
+        )
+        unique_indices, positions = np.unique(indices, return_inverse=True)
+
+        return coo_array(
+            (np.bincount(positions, weights=values), (unique_indices,)),
+            shape=(self.index.n,),
+        )
+
+    def compute_scores(
+        self,
+        markov_strategy: Optional[MarkovStrategy] = None,
+        top_k: Optional[int] = None,
+        seed_nodes: Optional[List[str]] = None,
+    ) -> Tuple[List[str], KernelMatrix]:
+        if seed_nodes is None:
+            seed_nodes = self.fetch_seed_nodes()
+        strategy = markov_strategy or self.markov_strategy
+
+        key = None
+        if self.result_cache is not None:
+            key = self.build_cache_key("scores", seed_nodes, strategy, top_k=top_k)
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                self.latency.annotate(cached=True)
+                return cached
+
+        # The same vector may be kept as a warm start and a cache entry
+        scores = freeze_scores(self.solve_scores(seed_nodes, strategy, top_k))
+        if key is not None:
+            self.result_cache.set(key, (seed_nodes, scores))
+
         return seed_nodes, scores
 
+    def solve_scores(
+        self,
+        seed_nodes: List[str],
+        strategy: MarkovStrategy,
+        top_k: Optional[int] = None,
+    ) -> KernelMatrix:
+        if self.can_use_ppr_cache():
+            return self.compute_cached_scores(seed_nodes, strategy)
+
+        if self.use_track_chain and self.has_exact_walk():
+            return self.compute_chain_scores(seed_nodes, strategy, top_k)
+
+        # With top_k, the solve may stop as soon as the top-k tracks are stable
+        candidates = self.get_candidate_indices(seed_nodes) if top_k else None
+
+        with self.latency.stage("walk_create"):
+            rw = RandomWalkFactory.create(
+                self.walk_strategy,
+                self.get_kernel(strategy),
+                self.index,
+                seed_nodes,
+                x0=self.get_warm_start(strategy),
+                top_k=top_k,
+                candidates=candidates,
+            )
+
+        scores = self.run_walk(rw)
+        self.update_warm_start(strategy, rw, scores)
+        return scores
+
+    def compute_scores_batch(
+        self,
+        seed_sets: List[List[str]],
+        markov_strategy: Optional[MarkovStrategy] = None,
+    ) -> ndarray:
+        with self.latency.stage("walk_create"):
+            rw = RandomWalkFactory.create_batch(
+                self.walk_strategy,
+                self.get_kernel(markov_strategy),
+                self.index,
+                seed_sets,
+            )
+
+        return self.run_walk(rw)
+
     def get_track_id_from_node(self, node_name: str) -> int:
         return int(node_name.split(":")[1])
 
-    def recommend(self, top_k: int = 10) -> List[int]:
-        seed_nodes, scores = self.compute_scores()
+    def select_top_k(self, candidates: ndarray, values: ndarray, top_k: int) -> ndarray:
+        # Highest values first, ties broken by node index like a stable sort
+        k = min(top_k, len(candidates))
+        if k == 0:
+            return candidates[:0]
+
+        kth = np.partition(values, len(values) - k)[len(values) - k]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[: k - len(above)]
 
-        recommendations = []
+        selected = np.concatenate([above, ties])
+        order = np.lexsort((candidates[selected], -values[selected]))
+        return candidates[selected[order]]
 
-        for i, score in enumerate(scores):
-            node = self.index.idx_to_node[i]
+    def rank_scores(
+        self, seed_nodes: List[str], scores: KernelMatrix, top_k: int
+    ) -> List[int]:
+        with self.latency.stage("ranking"):
+            candidates = self.get_candidate_indices(seed_nodes)
 
-            if node in seed_nodes:
-                continue
+            if issparse(scores):
+                # Stored entries are enough unless fewer than top_k tracks scored
+                nodes = scores.coords[-1]
+                stored = np.isin(nodes, candidates) & (scores.data > 0)
+                if np.count_nonzero(stored) >= top_k:
+                    top = self.select_top_k(nodes[stored], scores.data[stored], top_k)
+                    return self.track_ids[top].tolist()
 
-            if self.G.nodes[node]["type"] != NodeType.TRACK.value:
-                continue
+                scores = scores.toarray()
 
-            recommendations.append((node, score))
+            top = self.select_top_k(candidates, scores[candidates], top_k)
+            return self.track_ids[top].tolist()
 
-        sorted_recommendations = sorted(
-            recommendations,
-            key=lambda x: x[1],
-            reverse=True,
-        )[:top_k]
+    def build_item_table(
+        self,
+        markov_strategy: Optional[MarkovStrategy] = None,
+        path: Optional[Path] = None,
+    ) -> ItemTable:
+        strategy = markov_strategy or self.markov_strategy
+
+        builder = ItemTableBuilder(
+            self.get_kernel(strategy),
+            self.index,
+            self.get_track_indices(),
+            **load_item_table_parameters(),
+        )
+        self.item_tables[strategy] = builder.build(path)
+
+        return self.item_tables[strategy]
+
+    def load_item_table(
+        self, path: Path, markov_strategy: Optional[MarkovStrategy] = None
+    ) -> ItemTable:
+        table = ItemTable.load(path)
+        if not table.matches(self.index):
+            raise ValueError(f"Item table {path} was built for another graph")
+
+        self.item_tables[markov_strategy or self.markov_strategy] = table
+        return table
+
+    def recommend_from_table(
+        self,
+        top_k: int = 10,
+        markov_strategy: Optional[MarkovStrategy] = None,
+        seed_nodes: Optional[List[str]] = None,
+    ) -> List[int]:
+        strategy = markov_strategy or self.markov_strategy
+        if strategy not in self.item_tables:
+            raise ValueError(f"No item table loaded for strategy {strategy}")
+
+        if seed_nodes is None:
+            seed_nodes = self.fetch_seed_nodes()
+
+        nodes, weights = InitialDistributionBuilder(
+            seed_nodes, self.index
+        ).get_seed_weights()
+        with self.latency.stage("table_lookup"):
+            neighbours, _ = self.item_tables[strategy].lookup(nodes, weights, top_k)
+
+        return self.track_ids[neighbours].tolist()
+
+    def recommend(
+        self,
+        top_k: int = 10,
+        markov_strategy: Optional[MarkovStrategy] = None,
+        early_stop: bool = False,
+        lookup: bool = False,
+    ) -> List[int]:
+        strategy = markov_strategy or self.markov_strategy
+
+        with self.latency.request("recommend", top_k=top_k):
+            seed_nodes = self.fetch_seed_nodes()
+
+            key = None
+            if self.result_cache is not None:
+                key = self.build_cache_key(
+                    "recommend",
+                    seed_nodes,
+                    strategy,
+                    top_k=top_k,
+                    early_stop=early_stop,
+                    lookup=lookup,
+                )
+                cached = self.result_cache.get(key)
+                if cached is not None:
+                    self.latency.annotate(cached=True)
+                    return cached
+
+            if lookup:
+                recommendations = self.recommend_from_table(top_k, strategy, seed_nodes)
+            else:
+                _, scores = self.compute_scores(
+                    strategy, top_k=top_k if early_stop else None, seed_nodes=seed_nodes
+                )
+                recommendations = self.rank_scores(seed_nodes, scores, top_k)
+
+            if key is not None:
+                self.result_cache.set(key, recommendations)
+
+            return recommendations
+
+    def recommend_batch(
+        self,
+        seed_sets: List[List[str]],
+        top_k: int = 10,
+        markov_strategy: Optional[MarkovStrategy] = None,
+    ) -> List[List[int]]:
+        with self.latency.request(
+            "recommend_batch", top_k=top_k, batch_size=len(seed_sets)
+        ):
+            scores = self.compute_scores_batch(seed_sets, markov_strategy)
 
-        return [self.get_track_id_from_node(x[0]) for x in sorted_recommendations]
+            return [
+                self.rank_scores(seed_nodes, seed_scores, top_k)
+                for seed_nodes, seed_scores in zip(seed_sets, scores)
+            ]
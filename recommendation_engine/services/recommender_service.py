@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from recommendation_engine.services.latency import LatencyRecorder
+from recommendation_engine.services.markov_recommender import MarkovRecommender
+from settings.constants import MarkovStrategy
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RecommenderSnapshot:
+    recommender: MarkovRecommender
+    version: int
+    built_at: float
+
+
+class RecommenderService:
+    # Serves recommendations from a snapshot: one MarkovRecommender whose graph,
+    # kernels and solver state are all built (warm_up) before it is published.
+    # Requests only add warm starts and cache entries to it, and keep their
+    # solver stats per thread. The next snapshot is built on a background
+    # thread and swapped in with a single reference assignment, so in-flight
+    # requests finish on the snapshot they started with.
+    def __init__(
+        self,
+        strategies: Optional[List[MarkovStrategy]] = None,
+        refresh_interval: Optional[float] = None,
+        **recommender_kwargs: Any,
+    ):
+        self.strategies = strategies or []
+        self.refresh_interval = refresh_interval
+        self.recommender_kwargs: Dict[str, Any] = recommender_kwargs
+        # Shared by every snapshot, so the histograms survive a swap
+        self.latency: LatencyRecorder = recommender_kwargs.setdefault(
+            "latency", LatencyRecorder.from_config()
+        )
+
+        self.swap_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="snapshot_builder"
+        )
+        self.pending: Optional[Future] = None
+        self.stop_event = threading.Event()
+        self.refresher: Optional[threading.Thread] = None
+
+        self.current = self.build_snapshot(version=1)
+        if self.refresh_interval:
+            self.start()
+
+    @property
+    def snapshot(self) -> RecommenderSnapshot:
+        return self.current
+
+    def build_snapshot(self, version: int) -> RecommenderSnapshot:
+        start = time.perf_counter()
+
+        recommender = MarkovRecommender(**self.recommender_kwargs)
+        for strategy in self.strategies or [recommender.markov_strategy]:
+            recommender.warm_up(strategy)
+
+        logger.info(
+            f"Built recommender snapshot v{version} "
+            f"({recommender.index.n} nodes) in {time.perf_counter() - start:.2f}s"
+        )
+        return RecommenderSnapshot(recommender, version, time.time())
+
+    def swap(self, snapshot: RecommenderSnapshot) -> None:
+        with self.swap_lock:
+            if snapshot.version > self.current.version:
+                self.current = snapshot
+                logger.info(f"Swapped in recommender snapshot v{snapshot.version}")
+
+    def rebuild(self) -> RecommenderSnapshot:
+        snapshot = self.build_snapshot(self.current.version + 1)
+        self.swap(snapshot)
+        return snapshot
+
+    def rebuild_async(self) -> Future:
+        # At most one build in flight: later calls share the pending one
+        with self.swap_lock:
+            if self.pending is None or self.pending.done():
+                self.pending = self.executor.submit(self.rebuild)
+
+            return self.pending
+
+    def run_refresher(self) -> None:
+        while not self.stop_event.wait(self.refresh_interval):
+            try:
+                self.rebuild_async().result()
+            except Exception as e:
+                logger.error(f"Recommender snapshot rebuild failed: {e}")
+
+    def start(self) -> None:
+        if self.refresher is not None and self.refresher.is_alive():
+            return
+
+        self.stop_event.clear()
+        self.refresher = threading.Thread(
+            target=self.run_refresher, name="snapshot_refresher", daemon=True
+        )
+        self.refresher.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.refresher is not None:
+            self.refresher.join()
+            self.refresher = None
+
+        self.executor.shutdown(wait=True)
+
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        return self.latency.get_stats()
+
+    def recommend(
+        self,
+        top_k: int = 10,
+        markov_strategy: Optional[MarkovStrategy] = None,
+        early_stop: bool = False,
+        lookup: bool = False,
+    ) -> List[int]:
+        return self.snapshot.recommender.recommend(
+            top_k=top_k,
+            markov_strategy=markov_strategy,
+            early_stop=early_stop,
+            lookup=lookup,
+        )
+
+    def recommend_batch(
+        self,
+        seed_sets: List[List[str]],
+        top_k: int = 10,
+        markov_strategy: Optional[MarkovStrategy] = None,
+    ) -> List[List[int]]:
+        return self.snapshot.recommender.recommend_batch(
+            seed_sets, top_k=top_k, markov_strategy=markov_strategy
+        )
@@ -0,0 +1,200 @@
+import hashlib
+import io
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import coo_array, issparse
+
+from settings.config_loader import load_result_cache_parameters
+
+
+class ResultCacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class MemoryBackend(ResultCacheBackend):
+    # In-process LRU whose entries also expire ttl seconds after being stored
+    def __init__(self, max_entries: int = 10000, ttl: float = 300.0):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl)
+        self.entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+def freeze_scores(scores: Any) -> Any:
+    # Score vectors are shared by the cache, the warm starts and every caller,
+    # so writes to them raise instead of corrupting later requests
+    arrays = [scores.data, *scores.coords] if issparse(scores) else [scores]
+    for array in arrays:
+        array.setflags(write=False)
+
+    return scores
+
+
+def copy_value(value: Any) -> Any:
+    # Recommendation lists are copied, score vectors are read-only
+    if isinstance(value, list):
+        return list(value)
+
+    seed_nodes, scores = value
+    return list(seed_nodes), freeze_scores(scores)
+
+
+def encode_value(value: Any) -> bytes:
+    # Recommendations as JSON, (seed_nodes, scores) pairs as an npz archive
+    if isinstance(value, list):
+        return b"J" + json.dumps(value).encode()
+
+    seed_nodes, scores = value
+    arrays = {"seed_nodes": np.array(seed_nodes, dtype=str)}
+    if issparse(scores):
+        arrays.update(
+            indices=scores.coords[-1], data=scores.data, shape=np.array(scores.shape)
+        )
+    else:
+        arrays.update(scores=scores)
+
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return b"N" + buffer.getvalue()
+
+
+def decode_value(payload: bytes) -> Any:
+    if payload[:1] == b"J":
+        return json.loads(payload[1:])
+
+    with np.load(io.BytesIO(payload[1:])) as data:
+        seed_nodes = data["seed_nodes"].tolist()
+        if "scores" in data:
+            return seed_nodes, data["scores"]
+
+        shape = tuple(int(size) for size in data["shape"])
+        return seed_nodes, coo_array((data["data"], (data["indices"],)), shape=shape)
+
+
+class RedisBackend(ResultCacheBackend):
+    # Shared cache in Redis, expiring entries server-side. redis is imported
+    # only when no client is given.
+    def __init__(
+        self,
+        client: Any = None,
+        url: str = "redis://localhost:6379/0",
+        ttl: float = 300.0,
+        prefix: str = "markov:",
+    ):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url)
+
+        self.client = client
+        self.ttl = float(ttl)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        payload = self.client.get(self.prefix + key)
+        return None if payload is None else decode_value(payload)
+
+    def set(self, key: str, value: Any) -> None:
+        self.client.set(
+            self.prefix + key, encode_value(value), px=max(int(self.ttl * 1000), 1)
+        )
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class ResultCache:
+    def __init__(self, backend: Optional[ResultCacheBackend] = None):
+        self.backend = backend or MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def from_config() -> "ResultCache":
+        params = load_result_cache_parameters()
+
+        if params.get("backend", "memory") == "redis":
+            return ResultCache(
+                RedisBackend(
+                    url=params["redis_url"],
+                    ttl=params["ttl"],
+                    prefix=params["prefix"],
+                )
+            )
+
+        return ResultCache(
+            MemoryBackend(max_entries=params["max_entries"], ttl=params["ttl"])
+        )
+
+    @staticmethod
+    def build_key(kind: str, seed_nodes: List[str], **params: Any) -> str:
+        # Seeds are sorted but not de-duplicated: a repeated seed changes pi0
+        payload = {"kind": kind, "seeds": sorted(seed_nodes), **params}
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.backend.get(key)
+
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return None if value is None else copy_value(value)
+
+    def set(self, key: str, value: Any) -> None:
+        self.backend.set(key, copy_value(value))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
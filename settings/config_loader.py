@@ -1,9 +1,9 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, Union
 
 import yaml
 
 from config import Config
-from settings.constants import MarkovStrategy
+from settings.constants import MarkovStrategy, Precision
 
 
 def validate_type_transition_matrix(T: Dict[str, Dict[str, float]]) -> None:
@@ -43,3 +43,46 @@ def load_random_walk_parameters() -> Dict[str, Dict[str, float]]:
         data = yaml.safe_load(f)
 
     return data["random_walk"]
+
+
+def load_random_walk_precision() -> Precision:
+    params = load_random_walk_parameters()
+    return Precision(params.get("precision", Precision.FLOAT64.value))
+
+
+def load_ppr_cache_parameters() -> Dict[str, Union[int, float]]:
+    params = load_random_walk_parameters().get("ppr_cache", {})
+    return {key: float(value) for key, value in params.items()}
+
+
+def load_item_table_parameters() -> Dict[str, int]:
+    params = load_random_walk_parameters().get("item_table", {})
+    return {key: int(value) for key, value in params.items()}
+
+
+def load_track_chain_parameters() -> Dict[str, Union[int, float]]:
+    params = load_random_walk_parameters().get("track_chain", {})
+    return {
+        key: int(value) if key == "max_horizon" else float(value)
+        for key, value in params.items()
+    }
+
+
+def load_result_cache_parameters() -> Dict[str, Union[int, float, str]]:
+    params = dict(load_random_walk_parameters().get("result_cache", {}))
+    params["max_entries"] = int(params.get("max_entries", 10000))
+    params["ttl"] = float(params.get("ttl", 300))
+    return params
+
+
+def load_micro_batching_parameters() -> Dict[str, float]:
+    params = load_random_walk_parameters().get("micro_batching", {})
+    return {key: float(value) for key, value in params.items()}
+
+
+def load_latency_parameters() -> Dict[str, Union[int, bool]]:
+    params = load_random_walk_parameters().get("latency", {})
+    return {
+        "max_samples": int(params.get("max_samples", 10000)),
+        "log_requests": bool(params.get("log_requests", False)),
+    }
@@ -69,6 +69,34 @@ class MarkovStrategy(str, Enum):
     EXPLORATION = "exploration"
 
 
+class Precision(str, Enum):
+    FLOAT32 = "float32"
+    FLOAT64 = "float64"
+
+
+class PowerIterationSolver(str, Enum):
+    JACOBI = "jacobi"
+    GAUSS_SEIDEL = "gauss_seidel"
+    ANDERSON = "anderson"
+    QUADRATIC_EXTRAPOLATION = "quadratic_extrapolation"
+
+
+class LinearSolverMethod(str, Enum):
+    SPLU = "splu"
+    GMRES = "gmres"
+    BICGSTAB = "bicgstab"
+
+
+class Preconditioner(str, Enum):
+    NONE = "none"
+    JACOBI = "jacobi"
+    ILU = "ilu"
+
+
 class RandomWalkStrategy(str, Enum):
     POWER_ITERATION = "power_iteration"
     MONTE_CARLO = "monte_carlo"
+    FORWARD_PUSH = "forward_push"
+    MONTE_CARLO_PPR = "monte_carlo_ppr"
+    LINEAR_SOLVER = "linear_solver"
+    LOW_RANK = "low_rank"
@@ -11,6 +11,8 @@ AUTHORIZED_RELATIONS = {
     (NodeType.TAG, NodeType.TAG): Relation(RelationType.TAG_TAG),
 }
 
+NODE_TYPE_CODES = {node_type.value: code for code, node_type in enumerate(NodeType)}
+
 NODE_COLORS = {
     NodeType.ALBUM.value: NodeColor.GREEN.value,
     NodeType.ARTIST.value: NodeColor.ORANGE.value,
@@ -0,0 +1,98 @@
+import os
+import random
+
+import pytest
+
+for name in (
+    "API_KEY_LASTFM",
+    "CLIENT_SECRET_LASTFM",
+    "CLIENT_ID_SPOTIFY",
+    "CLIENT_SECRET_SPOTIFY",
+    "REDIRECT_URI_SPOTIFY",
+    "DATABASE_URL_PROD",
+    "DATABASE_URL_EXP",
+    "DATABASE_URL_TEST",
+):
+    os.environ.setdefault(name, "sqlite://")
+os.environ.setdefault("APP_ENV", "test")
+
+from recommendation_engine.graph.builder import GraphBuilder  # noqa: E402
+from recommendation_engine.markov import MarkovKernel  # noqa: E402
+from settings.constants import MarkovStrategy, NodeType  # noqa: E402
+
+# Seed sets shared by the solver tests, including a repeated seed
+SEED_SETS = [["track:0", "track:7"], ["track:3"], ["track:0", "track:0", "track:9"]]
+
+
+def make_graph(
+    n_tracks: int = 200,
+    n_artists: int = 40,
+    n_albums: int = 50,
+    n_tags: int = 15,
+    seed: int = 0,
+):
+    rng = random.Random(seed)
+    builder = GraphBuilder()
+
+    tracks = [builder.build_node(NodeType.TRACK, i) for i in range(n_tracks)]
+    artists = [builder.build_node(NodeType.ARTIST, i) for i in range(n_artists)]
+    albums = [builder.build_node(NodeType.ALBUM, i) for i in range(n_albums)]
+    tags = [builder.build_node(NodeType.TAG, i) for i in range(n_tags)]
+
+    for node in tracks + artists + albums + tags:
+        builder.add_node(node)
+
+    def connect(u, v):
+        builder.add_edge(builder.build_edge((u, v)))
+
+    for track in tracks:
+        connect(track, rng.choice(artists))
+        connect(track, rng.choice(albums))
+
+    for album in albums:
+        connect(album, rng.choice(artists))
+        if rng.random() < 0.5:
+            connect(album, rng.choice(albums))
+
+    for artist in artists:
+        connect(artist, rng.choice(tags))
+        if rng.random() < 0.5:
+            connect(artist, rng.choice(artists))
+
+    for tag in tags:
+        connect(tag, rng.choice(artists))
+        if rng.random() < 0.3:
+            connect(tag, rng.choice(tags))
+
+    return builder.G
+
+
+@pytest.fixture
+def graph():
+    return make_graph()
+
+
+@pytest.fixture
+def kernel(graph):
+    kernel = MarkovKernel(graph, MarkovStrategy.BALANCED, sparse=True)
+    kernel.build_kernel()
+    return kernel
+
+
+@pytest.fixture
+def make_recommender(monkeypatch, graph):
+    from recommendation_engine.services import MarkovRecommender
+
+    def factory(seed_nodes, G=None, **kwargs):
+        builder = GraphBuilder()
+        builder.G = graph if G is None else G
+
+        monkeypatch.setattr(MarkovRecommender, "assemble_graph", lambda self: builder)
+        monkeypatch.setattr(
+            MarkovRecommender, "get_seed_nodes", lambda self: list(seed_nodes)
+        )
+
+        kwargs.setdefault("use_kernel_store", False)
+        return MarkovRecommender(**kwargs)
+
+    return factory
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from recommendation_engine.services import AsyncRecommender, ResultCache
+from settings.constants import RandomWalkStrategy
+from tests.conftest import SEED_SETS
+
+
+def run_requests(endpoint, requests):
+    async def main():
+        return await asyncio.gather(
+            *[endpoint.recommend(seeds, top_k) for seeds, top_k in requests],
+            return_exceptions=True,
+        )
+
+    try:
+        return asyncio.run(main())
+    finally:
+        endpoint.close()
+
+
+def expected_for(recommender, seeds, top_k):
+    _, scores = recommender.compute_scores(seed_nodes=seeds)
+    return recommender.rank_scores(seeds, scores, top_k)
+
+
+def spy_on_batches(recommender, monkeypatch):
+    solved = []
+    compute_scores_batch = recommender.compute_scores_batch
+
+    def spy(seed_sets, markov_strategy=None):
+        solved.append(seed_sets)
+        return compute_scores_batch(seed_sets, markov_strategy)
+
+    monkeypatch.setattr(recommender, "compute_scores_batch", spy)
+    return solved
+
+
+def test_concurrent_requests_share_one_batched_solve(make_recommender, monkeypatch):
+    recommender = make_recommender([], warm_start=False)
+    solved = spy_on_batches(recommender, monkeypatch)
+    requests = [(seeds, 5) for seeds in SEED_SETS * 3] + [(SEED_SETS[0][::-1], 3)]
+
+    endpoint = AsyncRecommender(recommender, max_wait_ms=50, max_batch_size=100)
+    results = run_requests(endpoint, requests)
+
+    assert endpoint.batches == 1
+    assert len(solved) == 1 and len(solved[0]) == len(SEED_SETS)
+    for (seeds, top_k), result in zip(requests, results):
+        assert result == expected_for(recommender, seeds, top_k)
+
+
+def test_batch_size_caps_the_window(make_recommender):
+    recommender = make_recommender([])
+    requests = [([f"track:{i}"], 5) for i in range(10)]
+
+    endpoint = AsyncRecommender(recommender, max_wait_ms=1000, max_batch_size=4)
+    results = run_requests(endpoint, requests)
+
+    assert endpoint.batches == 3
+    assert all(len(result) == 5 for result in results)
+
+
+def test_invalid_seed_sets_only_fail_their_own_requests(make_recommender):
+    recommender = make_recommender([])
+    requests = [(["track:1"], 5), (["track:unknown"], 5)]
+
+    results = run_requests(AsyncRecommender(recommender, max_wait_ms=10), requests)
+
+    assert results[0] == expected_for(recommender, ["track:1"], 5)
+    assert isinstance(results[1], ValueError)
+
+
+def test_unbatched_strategies_solve_each_seed_set(make_recommender):
+    recommender = make_recommender([], walk_strategy=RandomWalkStrategy.FORWARD_PUSH)
+    requests = [(seeds, 5) for seeds in SEED_SETS]
+
+    results = run_requests(AsyncRecommender(recommender, max_wait_ms=10), requests)
+
+    for (seeds, top_k), result in zip(requests, results):
+        assert result == expected_for(recommender, seeds, top_k)
+
+
+def test_batches_go_through_the_result_cache(make_recommender, monkeypatch):
+    recommender = make_recommender([], result_cache=ResultCache())
+    solved = spy_on_batches(recommender, monkeypatch)
+    recommender.compute_scores(seed_nodes=SEED_SETS[0])
+
+    requests = [(seeds, 5) for seeds in SEED_SETS]
+    first = run_requests(AsyncRecommender(recommender, max_wait_ms=10), requests)
+    second = run_requests(AsyncRecommender(recommender, max_wait_ms=10), requests)
+
+    assert solved == [SEED_SETS[1:]]
+    assert first == second
+    for (seeds, top_k), result in zip(requests, first):
+        assert result == expected_for(recommender, seeds, top_k)
+    assert recommender.result_cache.get_stats()["misses"] == 3
+
+
+@pytest.mark.parametrize(
+    "options", [{"use_track_chain": True}, {"use_ppr_cache": True}]
+)
+def test_per_set_paths_are_not_batched(make_recommender, monkeypatch, options):
+    recommender = make_recommender([], **options)
+    solved = spy_on_batches(recommender, monkeypatch)
+    requests = [(seeds, 5) for seeds in SEED_SETS]
+
+    results = run_requests(AsyncRecommender(recommender, max_wait_ms=10), requests)
+
+    assert solved == []
+    for (seeds, top_k), result in zip(requests, results):
+        assert result == expected_for(recommender, seeds, top_k)
@@ -0,0 +1,51 @@
+import numpy as np
+
+from recommendation_engine.markov import ItemTable, ItemTableBuilder
+
+
+def build_table(recommender, **kwargs):
+    return ItemTableBuilder(
+        recommender.P, recommender.index, recommender.get_track_indices(), **kwargs
+    ).build()
+
+
+def test_rows_hold_the_exact_top_neighbours(make_recommender):
+    recommender = make_recommender(["track:5"])
+    table = build_table(recommender, top_n=20, chunk_size=32)
+
+    _, scores = recommender.compute_scores()
+    seed = recommender.index.node_to_idx["track:5"]
+    tracks = recommender.get_track_indices()
+    expected = np.sort(scores[tracks[tracks != seed]])[::-1][:20]
+
+    row = np.searchsorted(table.tracks, seed)
+    assert seed not in table.neighbours[row]
+    np.testing.assert_allclose(table.scores[row], expected, rtol=1e-4, atol=1e-7)
+
+
+def test_lookup_matches_the_exact_ranking(make_recommender):
+    seeds = ["track:1", "track:1", "track:7"]
+    recommender = make_recommender(seeds)
+    recommender.item_tables[recommender.markov_strategy] = build_table(
+        recommender, top_n=100
+    )
+
+    exact = recommender.recommend(top_k=5)
+    assert recommender.recommend(top_k=5, lookup=True) == exact
+
+
+def test_chunks_and_workers_do_not_change_the_table(make_recommender, tmp_path):
+    recommender = make_recommender(["track:1"])
+    serial = build_table(recommender, top_n=10, chunk_size=1000)
+    parallel = build_table(recommender, top_n=10, chunk_size=16, workers=2)
+
+    np.testing.assert_array_equal(serial.neighbours, parallel.neighbours)
+    np.testing.assert_allclose(serial.scores, parallel.scores, rtol=1e-6)
+
+    path = tmp_path / "table.npz"
+    serial.save(path)
+    loaded = ItemTable.load(path)
+
+    assert loaded.matches(recommender.index)
+    np.testing.assert_array_equal(loaded.neighbours, serial.neighbours)
+    assert recommender.load_item_table(path) is not None
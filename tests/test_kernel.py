@@ -0,0 +1,154 @@
+from typing import Tuple
+
+import numpy as np
+import pytest
+from scipy.sparse import csr_array, issparse
+
+from recommendation_engine.markov import KernelDiagnostics, MarkovKernel
+from settings.constants import MarkovStrategy
+from settings.mapping import NODE_TYPE_CODES
+
+
+def build_reference_kernel(kernel: MarkovKernel) -> np.ndarray:
+    kernel.P = np.zeros((kernel.index.n, kernel.index.n))
+    for node in kernel.index.nodes:
+        kernel.fill_transition_row(node)
+
+    return kernel.P
+
+
+def to_dense(P) -> np.ndarray:
+    return P.toarray() if issparse(P) else np.asarray(P)
+
+
+@pytest.mark.parametrize("sparse", [True, False])
+def test_build_kernel_matches_per_node_builder(graph, sparse):
+    P = MarkovKernel(graph, MarkovStrategy.BALANCED, sparse=sparse).build_kernel()
+    reference = build_reference_kernel(MarkovKernel(graph, MarkovStrategy.BALANCED))
+
+    assert issparse(P) == sparse
+    np.testing.assert_allclose(to_dense(P), reference, atol=1e-12)
+
+
+def test_compose_kernel_matches_built_kernel(kernel):
+    composed = kernel.compose_kernel(MarkovStrategy.BALANCED)
+    np.testing.assert_allclose(composed.toarray(), kernel.P.toarray(), atol=1e-15)
+
+
+def test_float32_kernel_matches_float64(graph):
+    P64 = MarkovKernel(graph, MarkovStrategy.BALANCED, sparse=True).build_kernel()
+    P32 = MarkovKernel(
+        graph, MarkovStrategy.BALANCED, sparse=True, dtype=np.float32
+    ).build_kernel()
+
+    assert P32.dtype == np.float32
+    np.testing.assert_allclose(P32.toarray(), P64.toarray(), atol=1e-6)
+
+
+def test_isolated_node_is_rejected(graph):
+    graph.add_node("track:9999", type="track")
+
+    with pytest.raises(ValueError, match="at least one neighbor"):
+        MarkovKernel(graph, MarkovStrategy.BALANCED, sparse=True).build_kernel()
+
+
+def test_diagnose_reports_a_valid_kernel(kernel):
+    report = kernel.diagnose()
+    assert report.is_valid
+    assert report.n_nodes == kernel.index.n
+
+
+def build_faulty_kernel() -> Tuple[np.ndarray, np.ndarray]:
+    # 0 <-> 1 is an open SCC leaking into the closed SCC 2 <-> 3, whose row 2
+    # overshoots by 1e-6; 4 is absorbing and 5 is dangling
+    P = np.zeros((6, 6))
+    P[0, [1, 2]] = 0.5
+    P[1, [0, 1, 2]] = [0.4, 0.2, 0.4]
+    P[2, 3] = 1.0 + 1e-6
+    P[3, 2] = 1.0
+    P[4, 4] = 1.0
+
+    types = ["track", "artist", "album", "tag", "track", "tag"]
+    return P, np.array([NODE_TYPE_CODES[t] for t in types])
+
+
+@pytest.mark.parametrize("sparse", [True, False])
+def test_diagnostics_report_every_defect(sparse):
+    P, node_types = build_faulty_kernel()
+    report = KernelDiagnostics(
+        csr_array(P) if sparse else P, node_types, tol=1e-8
+    ).build_report()
+
+    assert not report.is_valid
+    assert report.n_nodes == 6
+    assert report.negative_entries == 0
+    np.testing.assert_array_equal(report.invalid_rows, [2])
+    np.testing.assert_array_equal(report.dangling_nodes, [5])
+    np.testing.assert_array_equal(report.self_loop_nodes, [1, 4])
+    np.testing.assert_array_equal(report.absorbing_nodes, [4])
+
+    errors = report.row_sum_errors
+    assert errors["max"] == pytest.approx(1e-6)
+    assert errors["mean"] == pytest.approx(2e-7)
+    assert errors["p50"] == pytest.approx(0.0, abs=1e-15)
+    assert errors["p95"] == pytest.approx(0.8e-6)
+    assert errors["p99"] == pytest.approx(0.96e-6)
+
+    mass = report.type_out_mass
+    assert mass["track"] == pytest.approx(
+        {"album": 0.25, "artist": 0.25, "tag": 0.0, "track": 0.5}
+    )
+    assert mass["artist"] == pytest.approx(
+        {"album": 0.4, "artist": 0.2, "tag": 0.0, "track": 0.4}
+    )
+    assert mass["album"]["tag"] == pytest.approx(1.0 + 1e-6)
+    assert mass["tag"] == pytest.approx(
+        {"album": 0.5, "artist": 0.0, "tag": 0.0, "track": 0.0}
+    )
+
+    np.testing.assert_array_equal(report.scc_sizes, [2, 2, 1, 1])
+    np.testing.assert_array_equal(report.closed_scc_sizes, [2, 1, 1])
+
+    summary = report.summary()
+    assert summary["dangling_nodes"] == 1
+    assert summary["n_scc"] == 4
+    assert summary["largest_scc"] == 2
+    assert summary["n_closed_scc"] == 3
+
+
+def test_diagnostics_count_negative_entries():
+    P, node_types = build_faulty_kernel()
+    P[0, [1, 2]] = [1.5, -0.5]
+
+    report = KernelDiagnostics(csr_array(P), node_types).build_report()
+
+    assert report.negative_entries == 1
+    assert not report.is_valid
+
+
+@pytest.mark.parametrize("sparse", [True, False])
+def test_incremental_update_matches_full_rebuild(graph, sparse):
+    kernel = MarkovKernel(graph, MarkovStrategy.BALANCED, sparse=sparse)
+    kernel.build_kernel()
+
+    added_nodes = ["track:9000", "artist:9000", "tag:9000"]
+    added_edges = [
+        ("track:9000", "artist:9000"),
+        ("track:9000", "album:3"),
+        ("artist:9000", "tag:9000"),
+        ("artist:9000", "artist:2"),
+        ("track:5", "artist:9000"),
+        ("tag:9000", "tag:1"),
+    ]
+    for node in added_nodes:
+        graph.add_node(node, type=node.split(":")[0])
+    graph.add_edges_from(added_edges)
+
+    kernel.update_kernel(added_nodes, added_edges)
+
+    full = MarkovKernel(graph, MarkovStrategy.BALANCED, sparse=sparse)
+    full.index = kernel.index
+    full.build_kernel()
+
+    np.testing.assert_allclose(to_dense(kernel.P), to_dense(full.P), atol=1e-15)
+    np.testing.assert_array_equal(kernel.node_types, full.node_types)
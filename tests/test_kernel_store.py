@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from recommendation_engine.markov import KernelStore, MarkovKernel
+from settings.constants import MarkovStrategy
+from tests.conftest import make_graph
+
+
+def list_snapshots(root: Path):
+    return [path for path in root.iterdir() if not path.name.startswith(".")]
+
+
+def test_snapshot_round_trip(graph, tmp_path):
+    store = KernelStore(tmp_path)
+    built = store.load_or_build(MarkovKernel(graph, MarkovStrategy.BALANCED, True))
+    loaded = store.load_or_build(MarkovKernel(graph, MarkovStrategy.BALANCED, True))
+
+    assert loaded.index.nodes == built.index.nodes
+    np.testing.assert_array_equal(loaded.node_types, built.node_types)
+    np.testing.assert_array_equal(loaded.P.toarray(), built.P.toarray())
+
+
+def test_superseded_snapshots_are_pruned(tmp_path):
+    store = KernelStore(tmp_path, keep=2)
+
+    for seed in range(4):
+        kernel = MarkovKernel(make_graph(seed=seed), MarkovStrategy.BALANCED, True)
+        store.load_or_build(kernel)
+
+    latest = store.build_key(kernel)
+    snapshots = list_snapshots(tmp_path)
+
+    assert len(snapshots) == 2
+    assert latest in {path.name for path in snapshots}
+
+
+def test_snapshots_of_other_lineages_are_kept(graph, tmp_path):
+    store = KernelStore(tmp_path, keep=1)
+    store.load_or_build(MarkovKernel(graph, MarkovStrategy.BALANCED, sparse=True))
+    store.load_or_build(MarkovKernel(graph, MarkovStrategy.BALANCED, sparse=False))
+
+    assert len(list_snapshots(tmp_path)) == 2
+
+
+def test_publish_keeps_a_concurrent_snapshot(graph, tmp_path):
+    store = KernelStore(tmp_path)
+    kernel = MarkovKernel(graph, MarkovStrategy.BALANCED, sparse=True)
+    kernel.build_kernel()
+    key = store.build_key(kernel)
+    store.save(key, kernel)
+
+    tmp = Path(tempfile.mkdtemp(dir=tmp_path, prefix=f".{key}."))
+    (tmp / "meta.json").write_text("{}")
+    try:
+        store.publish(key, tmp)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    assert store.read_meta(key)["key"] == key
+
+
+def test_unreadable_snapshot_is_rebuilt(graph, tmp_path):
+    store = KernelStore(tmp_path)
+    kernel = store.load_or_build(MarkovKernel(graph, MarkovStrategy.BALANCED, True))
+    key = store.build_key(kernel)
+    (store.get_path(key) / "data.npy").write_bytes(b"corrupted")
+
+    rebuilt = store.load_or_build(MarkovKernel(graph, MarkovStrategy.BALANCED, True))
+    np.testing.assert_array_equal(rebuilt.P.toarray(), kernel.P.toarray())
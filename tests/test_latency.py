@@ -0,0 +1,102 @@
+import json
+import logging
+
+import pytest
+
+from recommendation_engine.services import (
+    LatencyHistogram,
+    LatencyRecorder,
+    RecommenderService,
+)
+from settings.constants import MarkovStrategy, RandomWalkStrategy
+
+
+def test_histogram_keeps_a_rolling_window():
+    histogram = LatencyHistogram(max_samples=100)
+    for value in range(1000):
+        histogram.observe(value)
+
+    summary = histogram.get_summary()
+
+    assert summary["count"] == 1000
+    assert summary["p50"] == pytest.approx(949.5)
+    assert summary["p99"] == pytest.approx(998.01)
+    assert summary["max"] == 999
+    assert LatencyHistogram().get_summary() == {"count": 0}
+
+
+def test_recommend_records_every_stage(make_recommender):
+    recommender = make_recommender(["track:1", "track:2"], warm_start=False)
+
+    for _ in range(3):
+        recommender.recommend(top_k=5)
+    stats = recommender.latency.get_stats()
+
+    for name in [
+        "recommend_ms",
+        "seed_fetch_ms",
+        "walk_create_ms",
+        "walk_run_ms",
+        "ranking_ms",
+        "walk_iterations",
+    ]:
+        assert stats[name]["count"] == 3
+        assert stats[name]["p50"] <= stats[name]["p95"] <= stats[name]["p99"]
+
+    assert stats["walk_iterations"]["max"] == recommender.last_stats.iterations
+
+
+def test_forward_push_counts_pushes(make_recommender):
+    recommender = make_recommender(
+        ["track:1"], walk_strategy=RandomWalkStrategy.FORWARD_PUSH
+    )
+
+    recommender.recommend(top_k=5)
+
+    assert recommender.latency.get_stats()["walk_iterations"]["max"] > 0
+
+
+def test_logs_one_line_per_request(make_recommender, caplog):
+    latency = LatencyRecorder(log_requests=True)
+    recommender = make_recommender(["track:1", "track:2"], latency=latency)
+
+    with caplog.at_level(logging.INFO, logger="recommendation_engine.services"):
+        recommender.recommend(top_k=5)
+
+    lines = [
+        json.loads(record.getMessage())
+        for record in caplog.records
+        if record.name == "recommendation_engine.services.latency"
+    ]
+    assert len(lines) == 1
+    assert lines[0]["request"] == "recommend"
+    assert lines[0]["top_k"] == 5
+    assert lines[0]["seeds"] == 2
+    assert lines[0]["walk_iterations"] == recommender.last_stats.iterations
+    assert lines[0]["recommend_ms"] >= lines[0]["walk_run_ms"]
+
+
+def test_failed_requests_are_timed_and_flagged(make_recommender, caplog):
+    latency = LatencyRecorder(log_requests=True)
+    recommender = make_recommender(["track:unknown"], latency=latency)
+
+    with caplog.at_level(logging.INFO, logger="recommendation_engine.services"):
+        with pytest.raises(ValueError):
+            recommender.recommend(top_k=5)
+
+    assert latency.get_stats()["recommend_ms"]["count"] == 1
+    assert json.loads(caplog.records[-1].getMessage())["error"] == "ValueError"
+
+
+def test_service_keeps_stats_across_snapshots(make_recommender):
+    make_recommender(["track:1", "track:2"])
+    service = RecommenderService(
+        strategies=[MarkovStrategy.BALANCED], use_kernel_store=False
+    )
+
+    service.recommend(top_k=5)
+    service.rebuild()
+    service.recommend(top_k=5)
+    service.stop()
+
+    assert service.get_latency_stats()["recommend_ms"]["count"] == 2
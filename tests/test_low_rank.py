@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from recommendation_engine.markov import (
+    InitialDistributionBuilder,
+    LowRankResolvent,
+    PowerIterationRW,
+)
+from settings.constants import RandomWalkStrategy
+from settings.mapping import NODE_TYPE_CODES
+from tests.conftest import SEED_SETS
+
+
+@pytest.fixture
+def pi0(kernel):
+    return np.stack(
+        [InitialDistributionBuilder(seeds, kernel.index).build() for seeds in SEED_SETS]
+    )
+
+
+@pytest.mark.parametrize("exact_hops", [0, 2])
+def test_full_rank_reproduces_exact_scores(kernel, pi0, exact_hops):
+    resolvent = LowRankResolvent(
+        kernel.P, rank=kernel.index.n, exact_hops=exact_hops, tol=1e-12, random_state=0
+    )
+    exact = PowerIterationRW(kernel.P, pi0, tol=1e-12).run()
+
+    np.testing.assert_allclose(resolvent.scores(pi0), exact, atol=1e-8)
+    np.testing.assert_allclose(resolvent.scores(pi0[1]), exact[1], atol=1e-8)
+
+
+def test_accuracy_report_improves_with_rank(kernel, pi0):
+    tracks = np.flatnonzero(kernel.node_types == NODE_TYPE_CODES["track"])
+    resolvent = LowRankResolvent(kernel.P, rank=128, random_state=0)
+
+    report = resolvent.evaluate(pi0, [8, 32, 128], top_k=10, candidates=tracks)
+
+    assert [accuracy.rank for accuracy in report] == [8, 32, 128]
+    errors = [accuracy.l1_error for accuracy in report]
+    assert errors == sorted(errors, reverse=True)
+    assert report[-1].overlap >= report[0].overlap
+    assert report[-1].l1_error < 0.05
+
+
+def test_recommender_serves_low_rank_scores(make_recommender):
+    recommender = make_recommender(
+        ["track:1", "track:2"], walk_strategy=RandomWalkStrategy.LOW_RANK
+    )
+    seed_nodes, scores = recommender.compute_scores()
+
+    assert scores.shape == (recommender.index.n,)
+    assert len(recommender.recommend(top_k=5)) == 5
+    assert len(recommender.recommend_batch([seed_nodes, ["track:3"]], top_k=5)) == 2
+
+
+def test_warm_up_factorizes_before_serving(make_recommender, monkeypatch):
+    recommender = make_recommender(
+        ["track:1", "track:2"], walk_strategy=RandomWalkStrategy.LOW_RANK
+    )
+    recommender.warm_up()
+
+    def fail(self):
+        raise AssertionError("factorized while serving")
+
+    monkeypatch.setattr(LowRankResolvent, "factorize", fail)
+    assert len(recommender.recommend(top_k=5)) == 5
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from scipy.sparse import coo_array
+
+from settings.constants import RandomWalkStrategy
+
+
+def test_warm_start_reuses_the_previous_solution(make_recommender):
+    seeds = ["track:1", "track:2", "track:3"]
+    warm = make_recommender(seeds)
+    cold = make_recommender(seeds, warm_start=False)
+
+    first = warm.recommend()
+    first_iterations = warm.last_stats.iterations
+
+    assert warm.recommend() == first
+    assert warm.last_stats.iterations < first_iterations
+
+    seeds[:] = ["track:2", "track:3", "track:4"]
+    _, warm_scores = warm.compute_scores()
+    _, cold_scores = cold.compute_scores()
+
+    np.testing.assert_allclose(warm_scores, cold_scores, atol=1e-5)
+    assert warm.recommend() == cold.recommend()
+
+
+def test_warm_start_applies_to_the_linear_solver(make_recommender):
+    seeds = ["track:1", "track:2"]
+    recommender = make_recommender(
+        seeds, walk_strategy=RandomWalkStrategy.LINEAR_SOLVER
+    )
+
+    first = recommender.recommend()
+    first_iterations = recommender.last_stats.iterations
+
+    assert recommender.recommend() == first
+    assert recommender.last_stats.iterations < first_iterations
+
+
+def test_early_stop_returns_the_same_recommendations(make_recommender):
+    recommender = make_recommender(["track:11"], warm_start=False)
+
+    for top_k in (1, 5, 20):
+        expected = recommender.recommend(top_k=top_k)
+        iterations = recommender.last_stats.iterations
+
+        assert recommender.recommend(top_k=top_k, early_stop=True) == expected
+        assert recommender.last_stats.iterations <= iterations
+
+
+def test_ppr_cache_mixes_single_seed_vectors(make_recommender):
+    seeds = ["track:1", "track:1", "track:4"]
+    exact = make_recommender(seeds)
+    cached = make_recommender(seeds, use_ppr_cache=True)
+
+    _, exact_scores = exact.compute_scores()
+    _, cached_scores = cached.compute_scores()
+
+    np.testing.assert_allclose(cached_scores.toarray(), exact_scores, atol=1e-5)
+    assert cached.recommend() == exact.recommend()
+
+    cache = cached.get_ppr_cache(cached.markov_strategy)
+    assert cached.last_stats is None
+    assert cache.get_stats()["entries"] == 2
+    assert cache.get_stats()["hits"] >= 2
+
+
+def rank_by_loop(recommender, seed_nodes, scores, top_k):
+    recommendations = [
+        (node, score)
+        for node, score in zip(recommender.index.nodes, scores)
+        if node not in seed_nodes and node.startswith("track:")
+    ]
+    recommendations.sort(key=lambda x: x[1], reverse=True)
+
+    return [int(node.split(":")[1]) for node, _ in recommendations[:top_k]]
+
+
+@pytest.mark.parametrize("top_k", [1, 10, 500])
+def test_rank_scores_matches_a_stable_sort(make_recommender, top_k):
+    seed_nodes = ["track:1", "track:5"]
+    recommender = make_recommender(seed_nodes)
+
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 20, recommender.index.n).astype(float)
+    expected = rank_by_loop(recommender, seed_nodes, scores, top_k)
+    assert recommender.rank_scores(seed_nodes, scores, top_k) == expected
+
+    scores[rng.random(len(scores)) < 0.5] = 0
+    sparse = coo_array(scores)
+    expected = rank_by_loop(recommender, seed_nodes, scores, top_k)
+    assert recommender.rank_scores(seed_nodes, sparse, top_k) == expected
@@ -0,0 +1,31 @@
+import numpy as np
+
+from recommendation_engine.markov import PPRCache
+
+
+def test_truncates_and_returns_cached_vectors():
+    cache = PPRCache(threshold=1e-3)
+    scores = np.array([0.5, 1e-4, 0.2, 0.0, 0.3])
+
+    indices, values = cache.put(3, scores)
+    np.testing.assert_array_equal(indices, [0, 2, 4])
+    np.testing.assert_array_equal(values, [0.5, 0.2, 0.3])
+
+    assert cache.get(3) is not None
+    assert cache.get(4) is None
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used_entries_over_budget():
+    scores = np.full(10, 0.1)
+    entry_size = PPRCache.get_size(PPRCache().truncate(scores))
+    cache = PPRCache(max_bytes=2 * entry_size, threshold=0.0)
+
+    cache.put(0, scores)
+    cache.put(1, scores)
+    cache.get(0)
+    cache.put(2, scores)
+
+    assert set(cache.entries) == {0, 2}
+    assert cache.nbytes == 2 * entry_size
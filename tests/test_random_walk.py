@@ -0,0 +1,243 @@
+import numpy as np
+import pytest
+
+from recommendation_engine.markov import (
+    ForwardPushRW,
+    InitialDistributionBuilder,
+    LinearSolverRW,
+    MarkovKernel,
+    MonteCarloPPRRW,
+    MonteCarloRW,
+    PowerIterationRW,
+    WalkerEngine,
+)
+from recommendation_engine.markov.random_walk.block_matvec import BlockMatvec
+from settings.constants import (
+    LinearSolverMethod,
+    MarkovStrategy,
+    PowerIterationSolver,
+    Preconditioner,
+)
+from tests.conftest import SEED_SETS
+
+
+def build_pi0(kernel: MarkovKernel, seeds) -> np.ndarray:
+    return InitialDistributionBuilder(seeds, kernel.index).build()
+
+
+def solve_exact(kernel: MarkovKernel, seeds) -> np.ndarray:
+    return PowerIterationRW(kernel.P, build_pi0(kernel, seeds), tol=1e-13).run()
+
+
+def test_batched_power_iteration_matches_single_runs(kernel):
+    pi0 = np.stack([build_pi0(kernel, seeds) for seeds in SEED_SETS])
+    rw = PowerIterationRW(kernel.P, pi0, tol=1e-10)
+    batched = rw.run()
+
+    assert batched.shape == (len(SEED_SETS), kernel.index.n)
+    assert rw.stats.column_iterations.shape == (len(SEED_SETS),)
+    for seeds, scores in zip(SEED_SETS, batched):
+        single = PowerIterationRW(kernel.P, build_pi0(kernel, seeds), tol=1e-10).run()
+        np.testing.assert_allclose(scores, single, atol=1e-9)
+
+
+@pytest.mark.parametrize("seeds", SEED_SETS)
+def test_forward_push_error_is_bounded_by_residual_mass(kernel, seeds):
+    exact = solve_exact(kernel, seeds)
+    rw = ForwardPushRW(kernel.P, kernel.index, seeds, epsilon=1e-8)
+    scores = rw.run().toarray()
+
+    assert np.all(scores <= exact + 1e-12)
+    assert np.abs(scores - exact).sum() <= rw.residual_mass + 1e-9
+    assert rw.residual_mass < 1e-3
+
+
+def test_forward_push_without_any_push_keeps_the_seed_mass(kernel):
+    rw = ForwardPushRW(kernel.P, kernel.index, SEED_SETS[0], epsilon=1.0)
+    scores = rw.run()
+
+    assert scores.shape == (kernel.index.n,)
+    assert scores.nnz == 0
+    assert rw.pushes == 0
+    assert rw.residual_mass == pytest.approx(1.0)
+
+
+def test_walker_steps_follow_transition_probabilities(kernel):
+    node = kernel.index.node_to_idx["artist:0"]
+    engine = WalkerEngine(kernel.P)
+
+    steps = engine.step(np.full(200000, node), np.random.default_rng(0))
+    frequencies = np.bincount(steps, minlength=kernel.index.n) / len(steps)
+
+    np.testing.assert_allclose(frequencies, kernel.P[[node]].toarray()[0], atol=5e-3)
+
+
+def test_monte_carlo_is_reproducible_with_random_state(kernel):
+    def run(random_state):
+        rw = MonteCarloRW(
+            kernel.P,
+            kernel.index,
+            SEED_SETS[0],
+            steps=50,
+            walkers=20,
+            random_state=random_state,
+        )
+        return rw.run()
+
+    np.testing.assert_array_equal(run(3), run(3))
+    assert run(3).sum() == pytest.approx(1.0)
+
+
+def test_walker_tables_are_built_once_per_kernel(kernel):
+    first = MonteCarloRW(kernel.P, kernel.index, SEED_SETS[0], random_state=0)
+    second = MonteCarloRW(kernel.P, kernel.index, SEED_SETS[1], random_state=1)
+
+    assert first.engine is second.engine
+    assert first.engine is WalkerEngine.for_kernel(kernel.P)
+
+
+@pytest.mark.parametrize("seeds", SEED_SETS)
+def test_monte_carlo_ppr_estimates_the_power_iteration_vector(kernel, seeds):
+    exact = solve_exact(kernel, seeds)
+    rw = MonteCarloPPRRW(kernel.P, kernel.index, seeds, walks=100000, random_state=0)
+    scores = rw.run()
+
+    assert scores.sum() == pytest.approx(exact.sum(), rel=1e-2)
+    assert np.abs(scores - exact).sum() < 0.05
+
+    for node, estimate, low, high in rw.get_confidence_intervals(top_k=5):
+        assert low <= estimate <= high
+
+
+def test_monte_carlo_ppr_is_reproducible_with_random_state(kernel):
+    def run():
+        rw = MonteCarloPPRRW(
+            kernel.P, kernel.index, SEED_SETS[0], walks=5000, random_state=7
+        )
+        return rw.run()
+
+    np.testing.assert_array_equal(run(), run())
+
+
+def test_monte_carlo_ppr_reuses_its_worker_pool(kernel):
+    def run():
+        rw = MonteCarloPPRRW(
+            kernel.P,
+            kernel.index,
+            SEED_SETS[0],
+            walks=2000,
+            batch_size=500,
+            workers=2,
+            random_state=7,
+        )
+        return rw, rw.run()
+
+    first, scores = run()
+    second, repeated = run()
+
+    assert first.get_pool() is second.get_pool()
+    np.testing.assert_array_equal(scores, repeated)
+
+    single = MonteCarloPPRRW(
+        kernel.P, kernel.index, SEED_SETS[0], walks=2000, batch_size=500, random_state=7
+    )
+    np.testing.assert_array_equal(scores, single.run())
+
+
+@pytest.mark.parametrize("solver", list(PowerIterationSolver))
+@pytest.mark.parametrize("sparse", [True, False])
+@pytest.mark.parametrize("seeds", [SEED_SETS[0], SEED_SETS[2]])
+def test_solvers_agree_with_jacobi(graph, solver, sparse, seeds):
+    kernel = MarkovKernel(graph, MarkovStrategy.BALANCED, sparse=sparse)
+    kernel.build_kernel()
+    pi0 = build_pi0(kernel, seeds)
+
+    jacobi = PowerIterationRW(kernel.P, pi0, tol=1e-12)
+    reference = jacobi.run()
+    rw = PowerIterationRW(kernel.P, pi0, tol=1e-12, solver=solver)
+    scores = rw.run()
+
+    np.testing.assert_allclose(scores, reference, atol=1e-9)
+    assert rw.stats.solver == solver
+    assert rw.stats.converged
+    assert rw.stats.iterations == len(rw.stats.residuals)
+    assert rw.stats.iterations <= jacobi.stats.iterations
+
+
+@pytest.mark.parametrize(
+    "method, preconditioner",
+    [
+        (LinearSolverMethod.SPLU, Preconditioner.NONE),
+        (LinearSolverMethod.GMRES, Preconditioner.JACOBI),
+        (LinearSolverMethod.GMRES, Preconditioner.ILU),
+        (LinearSolverMethod.BICGSTAB, Preconditioner.NONE),
+        (LinearSolverMethod.BICGSTAB, Preconditioner.ILU),
+    ],
+)
+@pytest.mark.parametrize("sparse", [True, False])
+def test_linear_solvers_match_power_iteration(graph, method, preconditioner, sparse):
+    kernel = MarkovKernel(graph, MarkovStrategy.BALANCED, sparse=sparse)
+    kernel.build_kernel()
+    pi0 = np.stack([build_pi0(kernel, seeds) for seeds in SEED_SETS])
+
+    rw = LinearSolverRW(kernel.P, pi0, method=method, preconditioner=preconditioner)
+    scores = rw.run()
+
+    assert rw.stats.converged
+    for seeds, column in zip(SEED_SETS, scores):
+        np.testing.assert_allclose(column, solve_exact(kernel, seeds), atol=1e-8)
+
+    single = LinearSolverRW(
+        kernel.P, pi0[0], method=method, preconditioner=preconditioner
+    ).run()
+    np.testing.assert_allclose(single, scores[0], atol=1e-10)
+
+
+@pytest.mark.parametrize("top_k", [1, 3, 10])
+def test_rank_stable_stop_keeps_the_exact_top_k(kernel, top_k):
+    pi0 = build_pi0(kernel, ["track:11"])
+    exact = solve_exact(kernel, ["track:11"])
+    candidates = np.flatnonzero(np.arange(kernel.index.n) != 11)
+
+    full = PowerIterationRW(kernel.P, pi0, tol=1e-10)
+    full.run()
+    rw = PowerIterationRW(kernel.P, pi0, tol=1e-10, top_k=top_k, candidates=candidates)
+    scores = rw.run()
+
+    expected = candidates[np.argsort(-exact[candidates], kind="stable")[:top_k]]
+    ranked = candidates[np.argsort(-scores[candidates], kind="stable")[:top_k]]
+    np.testing.assert_array_equal(ranked, expected)
+
+    if rw.stats.rank_stable:
+        assert not rw.stats.converged
+        assert rw.stats.iterations < full.stats.iterations
+        assert rw.stats.iterations_saved > 0
+
+
+@pytest.mark.parametrize("n_threads", [2, 3, 8])
+def test_block_matvec_matches_the_sparse_product(kernel, n_threads):
+    matvec = BlockMatvec(kernel.P, n_threads)
+    x = np.random.default_rng(0).random((kernel.index.n, 4))
+
+    assert matvec.blocks[0][0] == 0 and matvec.blocks[-1][1] == kernel.index.n
+    np.testing.assert_allclose(matvec.apply_transposed(x), kernel.P.T @ x)
+    np.testing.assert_allclose(matvec.apply_transposed(x[:, 0]), x[:, 0] @ kernel.P)
+
+
+@pytest.mark.parametrize(
+    "solver", [PowerIterationSolver.JACOBI, PowerIterationSolver.ANDERSON]
+)
+def test_threaded_power_iteration_matches_single_thread(kernel, solver):
+    pi0 = build_pi0(kernel, SEED_SETS[0])
+    single = PowerIterationRW(kernel.P, pi0, solver=solver, tol=1e-10).run()
+    threaded = PowerIterationRW(
+        kernel.P, pi0, solver=solver, tol=1e-10, n_threads=4
+    ).run()
+    np.testing.assert_allclose(threaded, single, atol=1e-12)
+
+    batch = np.stack([build_pi0(kernel, seeds) for seeds in SEED_SETS])
+    np.testing.assert_allclose(
+        PowerIterationRW(kernel.P, batch, tol=1e-10, n_threads=4).run(),
+        PowerIterationRW(kernel.P, batch, tol=1e-10).run(),
+        atol=1e-12,
+    )
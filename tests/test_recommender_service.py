@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+
+from recommendation_engine.services import RecommenderService, ResultCache
+from settings.constants import MarkovStrategy
+
+
+@pytest.fixture
+def service(make_recommender):
+    make_recommender(["track:1", "track:2"])
+    service = RecommenderService(
+        strategies=[MarkovStrategy.BALANCED], use_kernel_store=False
+    )
+    yield service
+    service.stop()
+
+
+def test_serves_from_the_current_snapshot(service):
+    snapshot = service.snapshot
+
+    assert snapshot.version == 1
+    assert MarkovStrategy.BALANCED in snapshot.recommender.kernels
+    assert service.recommend(top_k=5) == snapshot.recommender.recommend(top_k=5)
+
+
+def test_rebuild_swaps_without_touching_in_flight_snapshots(service):
+    before = service.snapshot
+    expected = before.recommender.recommend(top_k=5)
+
+    after = service.rebuild_async().result()
+
+    assert service.snapshot is after
+    assert after.version == before.version + 1
+    assert after.recommender is not before.recommender
+    assert before.recommender.recommend(top_k=5) == expected
+    assert service.recommend(top_k=5) == expected
+
+
+def test_concurrent_requests_during_rebuilds(service):
+    expected = service.recommend(top_k=5)
+    results, errors = [], []
+
+    def serve():
+        try:
+            for _ in range(20):
+                results.append(service.recommend(top_k=5))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=serve) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for _ in range(3):
+        service.rebuild()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert all(result == expected for result in results)
+    assert service.snapshot.version == 4
+
+
+def test_background_refresher_swaps_periodically(make_recommender):
+    make_recommender(["track:1"])
+    service = RecommenderService(refresh_interval=0.01, use_kernel_store=False)
+
+    try:
+        for _ in range(500):
+            if service.snapshot.version > 1:
+                break
+            threading.Event().wait(0.01)
+    finally:
+        service.stop()
+
+    assert service.snapshot.version > 1
+
+
+def test_snapshots_are_built_before_serving(make_recommender):
+    make_recommender(["track:1", "track:2"])
+    service = RecommenderService(
+        use_kernel_store=False, use_track_chain=True, result_cache=ResultCache()
+    )
+    recommender = service.snapshot.recommender
+    service.stop()
+
+    assert recommender.graph_version is not None
+    assert recommender.markov_strategy in recommender.track_chains
+
+
+def test_solver_stats_are_kept_per_thread(make_recommender):
+    recommender = make_recommender([], warm_start=False)
+    seed_sets = [["track:1"], ["track:2", "track:5", "track:9"]]
+
+    expected = []
+    for seed_nodes in seed_sets:
+        recommender.compute_scores(seed_nodes=seed_nodes, top_k=3)
+        expected.append(recommender.last_stats)
+
+    barrier = threading.Barrier(len(seed_sets))
+    seen = {}
+
+    def solve(i):
+        recommender.compute_scores(seed_nodes=seed_sets[i], top_k=3)
+        barrier.wait()
+        seen[i] = recommender.last_stats
+
+    threads = [threading.Thread(target=solve, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert expected[0].residuals != expected[1].residuals
+    for i, stats in enumerate(expected):
+        assert seen[i].residuals == stats.residuals
+    assert recommender.last_stats is expected[-1]
@@ -0,0 +1,165 @@
+import fnmatch
+import time
+
+import numpy as np
+import pytest
+from scipy.sparse import coo_array, issparse
+
+from recommendation_engine.services import (
+    MemoryBackend,
+    RedisBackend,
+    ResultCache,
+)
+from settings.constants import RandomWalkStrategy
+
+
+class InMemoryRedis:
+    # The subset of the redis-py client the backend uses
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        value, expires_at = self.store.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.store[key]
+            return None
+        return value
+
+    def set(self, key, value, px=None):
+        self.store[key] = (value, time.monotonic() + px / 1000 if px else None)
+
+    def scan_iter(self, match="*"):
+        return [key for key in list(self.store) if fnmatch.fnmatch(key, match)]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+
+def test_memory_backend_evicts_and_expires():
+    backend = MemoryBackend(max_entries=2, ttl=0.05)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.get("a")
+    backend.set("c", 3)
+
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+
+    time.sleep(0.06)
+    assert backend.get("a") is None
+
+
+def test_keys_ignore_seed_order_but_not_repeats():
+    key = ResultCache.build_key("scores", ["track:2", "track:1"], top_k=5)
+
+    assert key == ResultCache.build_key("scores", ["track:1", "track:2"], top_k=5)
+    assert key != ResultCache.build_key("scores", ["track:1", "track:2"], top_k=6)
+    assert key != ResultCache.build_key(
+        "scores", ["track:1", "track:2", "track:2"], top_k=5
+    )
+
+
+def test_redis_backend_round_trips_results():
+    client = InMemoryRedis()
+    cache = ResultCache(RedisBackend(client=client, ttl=0.05))
+    dense = np.array([0.5, 0.0, 0.25])
+    sparse = coo_array(dense)
+
+    cache.set("recommend", [3, 1, 2])
+    cache.set("dense", (["track:1"], dense))
+    cache.set("sparse", (["track:1", "track:2"], sparse))
+
+    assert cache.get("recommend") == [3, 1, 2]
+    seeds, scores = cache.get("dense")
+    assert seeds == ["track:1"]
+    np.testing.assert_array_equal(scores, dense)
+    seeds, scores = cache.get("sparse")
+    assert seeds == ["track:1", "track:2"]
+    np.testing.assert_array_equal(scores.toarray(), dense)
+    assert cache.get_stats() == {"hits": 3, "misses": 0}
+
+    time.sleep(0.06)
+    assert cache.get("recommend") is None
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_recommender_serves_repeated_requests_from_the_cache(make_recommender):
+    seeds = ["track:1", "track:2"]
+    cache = ResultCache(RedisBackend(client=InMemoryRedis()))
+    recommender = make_recommender(seeds, result_cache=cache)
+    uncached = make_recommender(seeds)
+
+    expected = uncached.recommend(top_k=5)
+    assert recommender.recommend(top_k=5) == expected
+    assert cache.get_stats() == {"hits": 0, "misses": 2}
+
+    recommender.last_stats = None
+    assert recommender.recommend(top_k=5) == expected
+    assert recommender.last_stats is None
+    assert cache.get_stats() == {"hits": 1, "misses": 2}
+
+    _, scores = recommender.compute_scores()
+    np.testing.assert_allclose(scores, uncached.compute_scores()[1], atol=1e-5)
+    assert cache.get_stats()["hits"] == 2
+
+    seeds[:] = ["track:2", "track:1"]
+    assert recommender.recommend(top_k=5) == expected
+    assert cache.get_stats()["hits"] == 3
+
+    seeds[:] = ["track:3"]
+    recommender.recommend(top_k=5)
+    assert cache.get_stats()["misses"] == 4
+
+
+def test_graph_and_strategy_changes_miss(make_recommender, graph):
+    cache = ResultCache()
+    seeds = ["track:1"]
+    make_recommender(seeds, result_cache=cache).recommend()
+
+    make_recommender(
+        seeds, result_cache=cache, walk_strategy=RandomWalkStrategy.LINEAR_SOLVER
+    ).recommend()
+    assert cache.get_stats()["hits"] == 0
+
+    G = graph.copy()
+    G.remove_node("track:199")
+    make_recommender(seeds, G=G, result_cache=cache).recommend()
+    assert cache.get_stats()["hits"] == 0
+
+    make_recommender(seeds, result_cache=cache).recommend()
+    assert cache.get_stats()["hits"] == 1
+
+
+@pytest.mark.parametrize(
+    "walk_strategy",
+    [
+        RandomWalkStrategy.POWER_ITERATION,
+        RandomWalkStrategy.LINEAR_SOLVER,
+        RandomWalkStrategy.FORWARD_PUSH,
+    ],
+)
+def test_mutating_returned_values_leaves_the_cache_intact(
+    make_recommender, walk_strategy
+):
+    recommender = make_recommender(
+        ["track:1", "track:2"],
+        result_cache=ResultCache(),
+        walk_strategy=walk_strategy,
+    )
+
+    recommendations = recommender.recommend(top_k=3)
+    recommendations.append(999)
+    assert recommender.recommend(top_k=3) == recommendations[:3]
+
+    seed_nodes, scores = recommender.compute_scores()
+    seed_nodes.append("track:3")
+    values = scores.data if issparse(scores) else scores
+    with pytest.raises(ValueError):
+        values[:] = 0
+
+    assert recommender.compute_scores()[0] == ["track:1", "track:2"]
+    recommender.result_cache.clear()
+    np.testing.assert_allclose(
+        recommender.compute_scores()[1].sum(), values.sum(), rtol=1e-4
+    )
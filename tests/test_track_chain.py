@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from recommendation_engine.markov import (
+    InitialDistributionBuilder,
+    PowerIterationRW,
+    TrackChainBuilder,
+)
+from settings.constants import RandomWalkStrategy
+from settings.mapping import NODE_TYPE_CODES
+
+SEEDS = ["track:0", "track:0", "track:9", "track:42"]
+
+
+def get_tracks(kernel):
+    return np.flatnonzero(kernel.node_types == NODE_TYPE_CODES["track"])
+
+
+@pytest.mark.parametrize("threshold", [1e-12, 1e-4, 1e-2])
+def test_track_scores_are_within_the_stated_tolerance(kernel, threshold):
+    chain = TrackChainBuilder(kernel.P, get_tracks(kernel), threshold=threshold).build()
+    pi0 = InitialDistributionBuilder(SEEDS, kernel.index).build()
+
+    exact = PowerIterationRW(kernel.P, pi0, tol=1e-13).run()
+    scores = PowerIterationRW(chain.S, chain.restrict(pi0), tol=1e-13).run()
+
+    error = np.abs(chain.restrict(exact) - scores).sum()
+    assert error <= chain.get_score_tolerance() + 1e-10
+    assert chain.S.shape == (len(chain.tracks), len(chain.tracks))
+
+
+def test_exact_chain_reproduces_track_scores(kernel):
+    chain = TrackChainBuilder(
+        kernel.P, get_tracks(kernel), threshold=0.0, tol=1e-14, max_horizon=500
+    ).build()
+
+    pi0 = InitialDistributionBuilder(SEEDS, kernel.index).build()
+
+    exact = PowerIterationRW(kernel.P, pi0, tol=1e-13).run()
+    scores = PowerIterationRW(chain.S, chain.restrict(pi0), tol=1e-13).run()
+
+    assert chain.get_score_tolerance() < 1e-9
+    np.testing.assert_allclose(scores, chain.restrict(exact), atol=1e-10)
+
+
+@pytest.mark.parametrize(
+    "walk_strategy",
+    [RandomWalkStrategy.POWER_ITERATION, RandomWalkStrategy.LINEAR_SOLVER],
+)
+def test_recommender_ranks_tracks_from_the_chain(make_recommender, walk_strategy):
+    exact = make_recommender(SEEDS, walk_strategy=walk_strategy)
+    reduced = make_recommender(SEEDS, walk_strategy=walk_strategy, use_track_chain=True)
+
+    assert reduced.recommend(top_k=5) == exact.recommend(top_k=5)
+    assert reduced.recommend(top_k=5, early_stop=True) == exact.recommend(top_k=5)